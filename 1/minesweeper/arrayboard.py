@@ -0,0 +1,50 @@
+import numpy as np
+
+from minesweeper import Minesweeper
+
+
+class ArrayMinesweeper(Minesweeper):
+    """
+    Minesweeper game representation backed by NumPy arrays, for very
+    large boards. The number of nearby mines of every cell is computed
+    once, when the board is created.
+    """
+
+    def __init__(self, height=8, width=8, mines=8, seed=None):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+
+        # Place mines on distinct cells, reproducibly if a seed is given
+        rng = np.random.default_rng(seed)
+        positions = rng.choice(height * width, size=mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        self.mines = set(
+            (int(i), int(j))
+            for i, j in zip(*np.divmod(positions, width))
+        )
+
+        # Count nearby mines for every cell at once, by summing the
+        # eight shifted copies of the zero-padded board
+        padded = np.pad(self.board, 1).astype(np.int8)
+        self.counts = np.zeros((height, width), dtype=np.int8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    self.counts += padded[di:di + height, dj:dj + width]
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def is_mine(self, cell):
+        return bool(self.board[cell])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        return int(self.counts[cell])
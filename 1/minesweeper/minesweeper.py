@@ -1,5 +1,18 @@
 import itertools
 import random
+import time
+
+from collections import deque
+from fractions import Fraction
+from math import comb
+
+# Largest number of search nodes spent enumerating one frontier component
+# exactly before falling back to Monte Carlo sampling
+ENUMERATION_LIMIT = 100000
+
+# Number of consistent assignments drawn for a component that is too large
+# to enumerate
+COMPONENT_SAMPLES = 500
 
 
 class Minesweeper():
@@ -7,7 +20,11 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, seed=None):
+
+        # Mines are placed with a private generator if a seed is given,
+        # so that a seeded board is the same from run to run
+        rng = random if seed is None else random.Random(seed)
 
         # Set initial width, height, and number of mines
         self.height = height
@@ -24,8 +41,8 @@ class Minesweeper():
 
         # Add mines randomly
         while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
+            i = rng.randrange(height)
+            j = rng.randrange(width)
             if not self.board[i][j]:
                 self.mines.add((i, j))
                 self.board[i][j] = True
@@ -78,6 +95,33 @@ class Minesweeper():
 
         return count
 
+    def reveal(self, cell, revealed=()):
+        """
+        Reveals a safe cell, and if it has no nearby mines, every cell
+        around it as well, spreading through all connected cells with no
+        nearby mines. Cells in `revealed` are not revealed again.
+
+        Returns a dictionary mapping each newly revealed cell, in the order
+        revealed, to its number of nearby mines.
+        """
+        counts = dict()
+        queue = deque([cell])
+        seen = {cell}
+        while queue:
+            cell = queue.popleft()
+            if cell in revealed:
+                continue
+            count = self.nearby_mines(cell)
+            counts[cell] = count
+            if count != 0:
+                continue
+            for i in range(cell[0] - 1, cell[0] + 2):
+                for j in range(cell[1] - 1, cell[1] + 2):
+                    if (i, j) not in seen and 0 <= i < self.height and 0 <= j < self.width:
+                        seen.add((i, j))
+                        queue.append((i, j))
+        return counts
+
     def won(self):
         """
         Checks if all mines have been flagged.
@@ -141,12 +185,28 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, trace=None, stats=False):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines on the board, if known
+        self.total_mines = mines
+
+        # Optional callback `trace(event, **data)` told about every move,
+        # e.g. `print_trace`; nothing is formatted when it is None
+        self.trace = trace
+
+        # Optional counters, kept only if `stats` is True
+        self.stats = None
+        if stats:
+            self.stats = {
+                "sentences_created": 0,
+                "inferences": [],
+                "move_times": []
+            }
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -154,8 +214,15 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, keyed by their cells
+        self.knowledge = dict()
+
+        # Index from each cell to the keys of the sentences containing it
+        self.sentences_by_cell = dict()
+
+        # Keys of sentences that still have to be examined for inferences
+        self.worklist = deque()
+        self.pending = set()
 
     def mark_mine(self, cell):
         """
@@ -163,8 +230,10 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for key in self.sentences_by_cell.pop(cell, set()):
+            sentence = self.remove_sentence(key)
             sentence.mark_mine(cell)
+            self.add_sentence(sentence)
 
     def mark_safe(self, cell):
         """
@@ -172,14 +241,91 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        for key in self.sentences_by_cell.pop(cell, set()):
+            sentence = self.remove_sentence(key)
             sentence.mark_safe(cell)
-    
-    def exists_in_knowledge(self, new_sentence):
-        for sentence in self.knowledge:
-            if new_sentence.cells.issubset(sentence.cells) and new_sentence.cells.issuperset(sentence.cells) or len(new_sentence.cells) == 0:
-                return True
-        return False
+            self.add_sentence(sentence)
+
+    def add_sentence(self, sentence):
+        """
+        Adds `sentence` to the knowledge base and queues it for inference,
+        unless it is empty or already known. Returns True if it was added.
+        """
+        key = frozenset(sentence.cells)
+        if not key or key in self.knowledge:
+            return False
+        self.knowledge[key] = sentence
+        for cell in key:
+            self.sentences_by_cell.setdefault(cell, set()).add(key)
+        if self.stats is not None:
+            self.stats["sentences_created"] += 1
+        if key not in self.pending:
+            self.pending.add(key)
+            self.worklist.append(key)
+        return True
+
+    def remove_sentence(self, key):
+        """
+        Removes the sentence with cells `key` from the knowledge base
+        and from the cell index, and returns it.
+        """
+        sentence = self.knowledge.pop(key)
+        for cell in key:
+            keys = self.sentences_by_cell.get(cell)
+            if keys is not None:
+                keys.discard(key)
+        return sentence
+
+    def infer(self):
+        """
+        Draws every conclusion that follows from the queued sentences.
+
+        Only sentences that were added or changed since the last call are
+        examined, and each one is only compared against the sentences that
+        share a cell with it, so the work done tracks the size of the change
+        rather than the size of the board.
+
+        Returns the number of inferences drawn: cells marked as mines or
+        safes, plus new sentences derived from subsets.
+        """
+        inferences = 0
+        while self.worklist:
+            key = self.worklist.popleft()
+            self.pending.discard(key)
+            sentence = self.knowledge.get(key)
+            if sentence is None:
+                continue
+
+            # Sentences that determine all of their cells resolve directly
+            if sentence.known_mines():
+                for mine in key:
+                    self.mark_mine(mine)
+                inferences += len(key)
+                continue
+            if sentence.known_safes():
+                for safe in key:
+                    self.mark_safe(safe)
+                inferences += len(key)
+                continue
+
+            # Subset inference against overlapping sentences only
+            overlapping = set()
+            for cell in key:
+                overlapping.update(self.sentences_by_cell.get(cell, ()))
+            overlapping.discard(key)
+            for other_key in overlapping:
+                other = self.knowledge.get(other_key)
+                if other is None:
+                    continue
+                if key < other_key:
+                    new_sentence = Sentence(other_key - key, other.count - sentence.count)
+                elif other_key < key:
+                    new_sentence = Sentence(key - other_key, sentence.count - other.count)
+                else:
+                    continue
+                if self.add_sentence(new_sentence):
+                    inferences += 1
+        return inferences
 
     def add_knowledge(self, cell, count):
         """
@@ -196,74 +342,34 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        if self.stats is not None:
+            start = time.perf_counter()
 
         # updating moves made and safes with move just made
         self.moves_made.add(cell)
         self.mark_safe(cell)
 
-        # creating new sentence based on surrounding cells and count
+        # creating new sentence from the undetermined surrounding cells
         surrounding_cells = set()
-        for i in range(cell[0]-1, cell[0]+2):
-            for j in range(cell[1]-1, cell[1]+2):
-                if (i, j) not in self.moves_made and (i, j) != cell:
-                        if i < self.width and j < self.height and i >= 0 and j >= 0:
-                            surrounding_cells.add((i, j))
-
-        # adding sentence if it does not already exist
-        new_sentence = Sentence(surrounding_cells, count)
-        if not self.exists_in_knowledge(new_sentence):
-            self.knowledge.append(new_sentence)
-
-        # making sure sentences have been 
-        for mine in self.mines:
-            self.mark_mine(mine)
-
-        # looping while there has just been a change to make sure to infer everthing
-        change = True
-        while change == True:
-            change = False
-            for sentence in self.knowledge:
-                if sentence.known_mines():
-                    change = True
-                    known_mines_copy = sentence.known_mines().copy()
-                    for mine in known_mines_copy:
-                        self.mark_mine(mine)
-                if sentence.known_safes():
-                    change = True
-                    known_safes_copy = sentence.known_safes().copy()
-                    for safe in known_safes_copy:
-                        self.mark_safe(safe)
-            for sentence in self.knowledge:
-                if len(sentence.cells) == 0:
-                    self.knowledge.remove(sentence)
-            for set1 in self.knowledge:
-                if len(set1.cells) == 0:
+        unknown_mines = count
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) == cell or not (0 <= i < self.height and 0 <= j < self.width):
                     continue
-                else:
-                    for set2 in self.knowledge:
-                        if set2.cells == set1.cells:
-                            continue
-                        elif len(set2.cells) == 0:
-                            continue
-                        elif set1.cells.issubset(set2.cells):
-                            new_count = set2.count - set1.count
-                            new_sentence = Sentence(set2.cells - set1.cells, new_count)
-                            if not self.exists_in_knowledge(new_sentence):
-                                self.knowledge.append(new_sentence)
-                                change = True
-
-
-        print("untried safes: ", str(set.difference(self.safes, self.moves_made)))
-        print("all safes: ", str(self.safes))
-        print("mines: ", str(self.mines))
-        kb = ""
-        for sentence in self.knowledge:
-            cells = ""
-            for cell in sentence.cells:
-                cells = cells + str(cell)
-            kb = kb + "\n" + cells + "       =       " + str(sentence.count) 
-        print("kb: ", kb, "\n")
+                if (i, j) in self.mines:
+                    unknown_mines -= 1
+                elif (i, j) not in self.safes:
+                    surrounding_cells.add((i, j))
+
+        # adding sentence and inferring everything that follows from it
+        self.add_sentence(Sentence(surrounding_cells, unknown_mines))
+        inferences = self.infer()
 
+        if self.stats is not None:
+            self.stats["inferences"].append(inferences)
+            self.stats["move_times"].append(time.perf_counter() - start)
+        if self.trace is not None:
+            self.trace("knowledge", ai=self, cell=cell, count=count)
 
     def make_safe_move(self):
         """
@@ -276,24 +382,391 @@ class MinesweeperAI():
         """
         for cell in self.safes:
             if cell not in self.moves_made:
-                print("safe move: ", str(cell))
+                if self.trace is not None:
+                    self.trace("safe move", ai=self, cell=cell)
                 return cell
 
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Should choose among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        The move is chosen randomly among the cells with the lowest
+        probability of being a mine, according to `mine_probabilities`.
+        """
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+        lowest = min(probabilities.values())
+        candidates = [
+            cell for cell, p in probabilities.items()
+            if p <= lowest + 1e-12
+        ]
+        cell = candidates[random.randrange(len(candidates))]
+        if self.trace is not None:
+            self.trace("random move", ai=self, cell=cell, probability=lowest)
+        return cell
+
+    def mine_probabilities(self):
         """
-        not_suicide_moves = []
-        
-        for i in range(self.width):
-            for j in range(self.height):
-                if (i,j) not in self.mines and (i, j) not in self.moves_made:
-                    not_suicide_moves.append((i, j))
-        if not_suicide_moves != []:
-            cell = not_suicide_moves[random.randrange(len(not_suicide_moves))]
-            print("random move: ", str(cell))
-            return cell
-        return None
+        Returns a dictionary mapping every cell that has not been chosen
+        and is not known to be a mine to the probability that it is a mine.
+
+        The cells mentioned in the knowledge base (the frontier) are split
+        into independent components of overlapping sentences, and the
+        consistent mine assignments of each component are counted by
+        backtracking (or sampled, if there are too many). When the total
+        number of mines is known, the assignments are weighted by the number
+        of ways to place the remaining mines on the other unknown cells.
+        """
+        unknown = set()
+        for i in range(self.height):
+            for j in range(self.width):
+                cell = (i, j)
+                if cell not in self.moves_made and cell not in self.mines:
+                    unknown.add(cell)
+        if not unknown:
+            return dict()
+
+        # Cells known to be safe are certain, whatever the knowledge says
+        probabilities = {cell: 0.0 for cell in unknown & self.safes}
+        unknown -= self.safes
+
+        sentences = list(self.knowledge.values())
+        frontier = set()
+        for sentence in sentences:
+            frontier.update(sentence.cells)
+        interior = unknown - frontier
+
+        # Count consistent assignments of each component by number of mines
+        distributions = []
+        for cells, constraints in frontier_components(sentences):
+            distribution = enumerate_component(cells, constraints)
+            if distribution is None:
+                distribution = sample_component(cells, constraints)
+            distributions.append((cells, distribution))
+
+        if self.total_mines is None:
+            probabilities.update(independent_probabilities(distributions, interior))
+        else:
+            remaining = self.total_mines - len(self.mines)
+            probabilities.update(
+                weighted_probabilities(distributions, interior, remaining)
+            )
+        return probabilities
+
+
+def print_trace(event, ai, **data):
+    """
+    Trace callback for `MinesweeperAI` that prints each event, and the
+    AI's whole knowledge base after every call to `add_knowledge`.
+    """
+    if event != "knowledge":
+        print(f"{event}: ", str(data["cell"]))
+        return
+    print("untried safes: ", str(ai.safes - ai.moves_made))
+    print("all safes: ", str(ai.safes))
+    print("mines: ", str(ai.mines))
+    kb = "".join(
+        "\n" + "".join(str(cell) for cell in sentence.cells)
+        + "       =       " + str(sentence.count)
+        for sentence in ai.knowledge.values()
+    )
+    print("kb: ", kb, "\n")
+
+
+def frontier_components(sentences):
+    """
+    Splits `sentences` into groups that share no cells.
+    Returns a list of (cells, constraints) pairs, where `cells` is a list of
+    the cells of one group and `constraints` is a list of (indices, count)
+    pairs with `indices` pointing into `cells`.
+    """
+    parent = dict()
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for sentence in sentences:
+        cells = list(sentence.cells)
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        for cell in cells[1:]:
+            parent[find(cell)] = find(cells[0])
+
+    groups = dict()
+    for sentence in sentences:
+        root = find(next(iter(sentence.cells)))
+        groups.setdefault(root, []).append(sentence)
+
+    components = []
+    for group in groups.values():
+
+        # Order cells sentence by sentence so constraints close early
+        cells = []
+        position = dict()
+        for sentence in group:
+            for cell in sentence.cells:
+                if cell not in position:
+                    position[cell] = len(cells)
+                    cells.append(cell)
+        constraints = [
+            ([position[cell] for cell in sentence.cells], sentence.count)
+            for sentence in group
+        ]
+        components.append((cells, constraints))
+    return components
+
+
+def enumerate_component(cells, constraints, limit=ENUMERATION_LIMIT):
+    """
+    Counts every assignment of mines to `cells` consistent with `constraints`.
+
+    Returns a dictionary mapping a number of mines k to a pair
+    [solutions, tallies], where `solutions` is the number of consistent
+    assignments with k mines and `tallies[i]` is how many of those place a
+    mine on `cells[i]`. Returns None if more than `limit` search nodes
+    would be needed.
+    """
+    distribution = dict()
+    order = list(range(len(cells)))
+    for assignment in consistent_assignments(constraints, order, limit):
+        if assignment is None:
+            return None
+        tally(distribution, assignment)
+    return distribution
+
+
+def sample_component(cells, constraints, samples=COMPONENT_SAMPLES):
+    """
+    Approximates `enumerate_component` for components too large to
+    enumerate, from `samples` random probes (see `probe`). Returns a
+    dictionary in the same format, holding estimated rather than exact
+    numbers of assignments.
+
+    Each probe is weighted by the inverse of the probability of the path
+    it took (Knuth's estimator), so the tallies are unbiased estimates of
+    the exact ones, on the same scale as other components' exact counts.
+    They are kept as exact fractions, since they are later multiplied by
+    numbers of ways to place mines far too large for a float.
+    """
+    distribution = dict()
+    order = list(range(len(cells)))
+    for _ in range(samples):
+        random.shuffle(order)
+        result = probe(constraints, order)
+        if result is not None:
+            assignment, weight = result
+            tally(distribution, assignment, Fraction(weight, samples))
+    return distribution
+
+
+def probe(constraints, order):
+    """
+    Builds one assignment to the cells in `order` without backtracking,
+    giving each cell a random value among those still consistent with
+    `constraints`.
+
+    Returns the assignment and its weight, the product of the number of
+    values each cell had to choose from, or None at a dead end.
+    """
+    touching, need, left = index_constraints(constraints, len(order))
+    assignment = [0] * len(order)
+    weight = 1
+    for i in order:
+        feasible = [
+            value for value in (0, 1)
+            if all(0 <= need[c] - value <= left[c] - 1 for c in touching[i])
+        ]
+        if not feasible:
+            return None
+        weight *= len(feasible)
+        value = random.choice(feasible)
+        assignment[i] = value
+        for c in touching[i]:
+            need[c] -= value
+            left[c] -= 1
+    return assignment, weight
+
+
+def tally(distribution, assignment, weight=1):
+    """
+    Adds one consistent `assignment`, counted `weight` times, to a
+    component `distribution`.
+    """
+    entry = distribution.setdefault(sum(assignment), [0, [0] * len(assignment)])
+    entry[0] += weight
+    tallies = entry[1]
+    for i, value in enumerate(assignment):
+        tallies[i] += weight * value
+
+
+def index_constraints(constraints, size):
+    """
+    Returns, for `constraints` over `size` cells, the list of constraints
+    touching each cell, and each constraint's number of mines still needed
+    and number of cells still unassigned.
+    """
+    touching = [[] for _ in range(size)]
+    need = []
+    left = []
+    for c, (indices, count) in enumerate(constraints):
+        need.append(count)
+        left.append(len(indices))
+        for i in indices:
+            touching[i].append(c)
+    return touching, need, left
+
+
+def consistent_assignments(constraints, order, limit=ENUMERATION_LIMIT):
+    """
+    Generates every assignment of 0s and 1s to the cells in `order` that is
+    consistent with `constraints`, by depth-first search in that order.
+    The same list is yielded each time, so callers must copy it to keep it.
+
+    Yields None and stops if more than `limit` search nodes are visited.
+    """
+    size = len(order)
+    touching, need, left = index_constraints(constraints, size)
+
+    def apply(i, value):
+        ok = True
+        for c in touching[i]:
+            need[c] -= value
+            left[c] -= 1
+            if need[c] < 0 or need[c] > left[c]:
+                ok = False
+        return ok
+
+    def undo(i, value):
+        for c in touching[i]:
+            need[c] += value
+            left[c] += 1
+
+    if size == 0:
+        yield []
+        return
+
+    assignment = [0] * size
+    choices = [None] * size
+    applied = [None] * size
+    choices[0] = [1, 0]
+    nodes = 0
+    k = 0
+    while k >= 0:
+        i = order[k]
+        if applied[k] is not None:
+            undo(i, applied[k])
+            applied[k] = None
+        if not choices[k]:
+            k -= 1
+            continue
+
+        nodes += 1
+        if nodes > limit:
+            yield None
+            return
+
+        value = choices[k].pop()
+        if not apply(i, value):
+            undo(i, value)
+            continue
+        applied[k] = value
+        assignment[i] = value
+        if k + 1 == size:
+            yield assignment
+        else:
+            k += 1
+            choices[k] = [1, 0]
+
+
+def independent_probabilities(distributions, interior):
+    """
+    Mine probabilities when the total number of mines is unknown: every
+    consistent assignment of a component is equally likely, and interior
+    cells get the average mine density of the frontier.
+    """
+    probabilities = dict()
+    expected_mines = 0
+    frontier_size = 0
+    for cells, distribution in distributions:
+        solutions = sum(entry[0] for entry in distribution.values())
+        if solutions == 0:
+            continue
+        for j, cell in enumerate(cells):
+            mines = sum(entry[1][j] for entry in distribution.values())
+            probabilities[cell] = float(mines / solutions)
+            expected_mines += probabilities[cell]
+        frontier_size += len(cells)
+    density = expected_mines / frontier_size if frontier_size else 0.5
+    for cell in interior:
+        probabilities[cell] = density
+    return probabilities
+
+
+def weighted_probabilities(distributions, interior, remaining):
+    """
+    Mine probabilities when `remaining` mines are left to be found: each
+    combination of component assignments with K mines in total is weighted
+    by the number of ways to place the other `remaining - K` mines among the
+    `interior` cells.
+    """
+    size = len(interior)
+
+    def ways(mines):
+        return comb(size, remaining - mines) if 0 <= remaining - mines <= size else 0
+
+    def convolve(a, b):
+        result = dict()
+        for i, x in a.items():
+            for j, y in b.items():
+                result[i + j] = result.get(i + j, 0) + x * y
+        return result
+
+    # Number of solutions of each component by mine count
+    counts = [
+        {k: entry[0] for k, entry in distribution.items()}
+        for cells, distribution in distributions
+    ]
+
+    # Prefix and suffix convolutions give each component's complement
+    prefix = [{0: 1}]
+    for count in counts:
+        prefix.append(convolve(prefix[-1], count))
+    suffix = [{0: 1}]
+    for count in reversed(counts):
+        suffix.append(convolve(suffix[-1], count))
+    suffix.reverse()
+
+    total = sum(x * ways(k) for k, x in prefix[-1].items())
+    if total == 0:
+        cells = set(interior)
+        for frontier, distribution in distributions:
+            cells.update(frontier)
+        return {cell: 0.5 for cell in cells}
+
+    probabilities = dict()
+    for c, (cells, distribution) in enumerate(distributions):
+        others = convolve(prefix[c], suffix[c + 1])
+        for j, cell in enumerate(cells):
+            mines = 0
+            for k, (solutions, tallies) in distribution.items():
+                if tallies[j]:
+                    mines += tallies[j] * sum(
+                        x * ways(k + other) for other, x in others.items()
+                    )
+            probabilities[cell] = float(mines / total)
+
+    if size:
+        interior_mines = sum(
+            x * ways(k) * (remaining - k) for k, x in prefix[-1].items()
+        )
+        density = float(interior_mines / total / size)
+        for cell in interior:
+            probabilities[cell] = density
+    return probabilities
@@ -0,0 +1,198 @@
+import argparse
+import math
+import os
+import random
+import time
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Board sizes as (height, width, mines)
+PRESETS = {
+    "beginner": (9, 9, 10),
+    "intermediate": (16, 16, 40),
+    "expert": (16, 30, 99),
+    "huge": (100, 100, 2000)
+}
+
+# Ratio between the bounds of consecutive timing histogram buckets
+BUCKET_RATIO = 1.05
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper games between the board and the AI "
+                    "without a display and report how the AI does."
+    )
+    parser.add_argument(
+        "boards", nargs="*", default=["beginner", "intermediate", "expert"],
+        help="preset names (" + ", ".join(PRESETS) + ") or HEIGHTxWIDTH"
+    )
+    parser.add_argument("-n", "--games", type=int, default=1000,
+                        help="number of games per board")
+    parser.add_argument("-m", "--mines", type=int,
+                        help="number of mines for HEIGHTxWIDTH boards")
+    parser.add_argument("-d", "--density", type=float,
+                        help="fraction of cells that are mines, for any board")
+    parser.add_argument("-p", "--processes", type=int,
+                        help="number of worker processes (default: all CPUs)")
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="seed of the first game; game k uses seed + k")
+    parser.add_argument("-a", "--array", action="store_true",
+                        help="use the NumPy-backed board (requires numpy)")
+    parser.add_argument("-f", "--flood", action="store_true",
+                        help="reveal all connected cells with no nearby mines")
+    args = parser.parse_args()
+
+    print(f"{'board':>16} {'games':>7} {'win rate':>9} "
+          f"{'moves/s':>10} {'p99 add_knowledge':>18}")
+    workers = args.processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for board in args.boards:
+            height, width, mines = board_size(board, args.mines, args.density)
+            results = simulate(
+                executor, height, width, mines, args.games, args.seed,
+                array=args.array, flood=args.flood, workers=workers
+            )
+            p99 = percentile(results["add_knowledge"], 0.99)
+            label = f"{height}x{width}:{mines}"
+            print(f"{label:>16} {results['games']:>7} "
+                  f"{results['wins'] / results['games']:>9.1%} "
+                  f"{results['moves'] / results['time']:>10.0f} "
+                  f"{p99 * 1000:>15.3f} ms")
+
+
+def board_size(board, mines=None, density=None):
+    """
+    Return (height, width, mines) for a preset name or a "HEIGHTxWIDTH"
+    string. `density` overrides the number of mines of any board; otherwise
+    `mines` is used for custom boards, defaulting to the expert density.
+    """
+    if board in PRESETS:
+        height, width, preset_mines = PRESETS[board]
+    else:
+        try:
+            height, width = (int(n) for n in board.lower().split("x"))
+        except ValueError:
+            raise ValueError(f"Unknown board {board!r}")
+        preset_mines = mines
+        if preset_mines is None:
+            preset_mines = round(height * width * 99 / (16 * 30))
+    if density is not None:
+        preset_mines = round(height * width * density)
+    return height, width, preset_mines
+
+
+def simulate(executor, height, width, mines, games, seed=0,
+             array=False, flood=False, workers=None):
+    """
+    Play `games` games on `height` x `width` boards with `mines` mines,
+    spread across the `workers` worker processes of `executor` (by default
+    one per CPU). See `play_game` for `array` and `flood`.
+
+    Return a dictionary with the number of games, wins and moves, the total
+    time spent playing, and a histogram of `add_knowledge` call times.
+    """
+    seeds = range(seed, seed + games)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunksize = max(1, games // (4 * workers))
+    totals = {
+        "games": 0,
+        "wins": 0,
+        "moves": 0,
+        "time": 0,
+        "add_knowledge": Counter()
+    }
+    for result in executor.map(
+        play_game,
+        [height] * games, [width] * games, [mines] * games, seeds,
+        [array] * games, [flood] * games,
+        chunksize=chunksize
+    ):
+        totals["games"] += 1
+        totals["wins"] += result["won"]
+        totals["moves"] += result["moves"]
+        totals["time"] += result["time"]
+        totals["add_knowledge"].update(result["add_knowledge"])
+    return totals
+
+
+def play_game(height, width, mines, seed, array=False, flood=False):
+    """
+    Play one game between a seeded `Minesweeper` board and a
+    `MinesweeperAI`, until the AI hits a mine or reveals every safe cell.
+
+    If `array` is True, the board is an `ArrayMinesweeper`. If `flood` is
+    True, each move reveals every connected cell with no nearby mines, and
+    the AI is told about each of them.
+    """
+    random.seed(seed)
+    if array:
+        from arrayboard import ArrayMinesweeper
+        game = ArrayMinesweeper(height=height, width=width, mines=mines, seed=seed)
+    else:
+        game = Minesweeper(height=height, width=width, mines=mines, seed=seed)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, stats=True)
+
+    start = time.perf_counter()
+    moves = 0
+    revealed = 0
+    won = False
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None:
+            won = ai.mines == game.mines
+            break
+        moves += 1
+        if game.is_mine(move):
+            break
+        if flood:
+            counts = game.reveal(move, ai.moves_made)
+        else:
+            counts = {move: game.nearby_mines(move)}
+        for cell, count in counts.items():
+            ai.add_knowledge(cell, count)
+        revealed += len(counts)
+        if revealed == height * width - mines:
+            won = True
+            break
+
+    return {
+        "won": won,
+        "moves": moves,
+        "time": time.perf_counter() - start,
+        "add_knowledge": Counter(bucket(t) for t in ai.stats["move_times"])
+    }
+
+
+def bucket(seconds):
+    """
+    Return the index of the histogram bucket holding a duration, so that
+    timings from many games can be merged without keeping every sample.
+    """
+    return math.ceil(math.log(max(seconds, 1e-9)) / math.log(BUCKET_RATIO))
+
+
+def percentile(histogram, q):
+    """
+    Return the upper bound of the bucket containing the `q` quantile
+    of a histogram built with `bucket`.
+    """
+    total = sum(histogram.values())
+    if total == 0:
+        return 0
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= q * total:
+            return BUCKET_RATIO ** index
+    return BUCKET_RATIO ** max(histogram)
+
+
+if __name__ == "__main__":
+    main()
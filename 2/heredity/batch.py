@@ -0,0 +1,130 @@
+import argparse
+import csv
+import glob
+import json
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+import elimination
+import heredity
+
+# Inference method run on each family, by name
+METHODS = {
+    "enumerate": heredity.infer,
+    "elimination": elimination.infer
+}
+
+# Method and inheritance tables shared by the families of a worker process
+shared = dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Infer gene and trait distributions for many families."
+    )
+    parser.add_argument("families", nargs="+",
+                        help="family CSV files, directories of them, or globs")
+    parser.add_argument("-o", "--output", required=True,
+                        help="file to write, as JSON or CSV by its extension")
+    parser.add_argument("-m", "--method", choices=list(METHODS),
+                        default="elimination", help="inference method")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="number of worker processes")
+    args = parser.parse_args()
+
+    paths = family_files(args.families)
+    results = infer_families(paths, args.method, args.processes)
+    write_results(results, args.output)
+    print(f"Wrote {len(results)} families to {args.output}")
+
+
+def family_files(patterns):
+    """
+    Return the sorted list of family files named by `patterns`, each
+    a file, a directory (standing for the CSV files in it) or a glob.
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.csv")
+        paths.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(paths)
+
+
+def infer_families(paths, method="elimination", processes=None,
+                   probs=heredity.PROBS):
+    """
+    Run inference method `method` (a key of `METHODS`) on each family file
+    in `paths` across a pool of `processes` worker processes.
+
+    The inheritance table is computed once here and handed to every worker,
+    rather than once per family.
+
+    Return a dictionary mapping each path to the `probabilities` dictionary
+    of its family, in the format of `heredity.main`.
+    """
+    tables = {probs["mutation"]: heredity.inheritance_table(probs["mutation"])}
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=share, initargs=(method, tables, probs)
+    ) as executor:
+        chunksize = max(1, len(paths) // (4 * (os.cpu_count() or 1)))
+        return dict(zip(paths, executor.map(infer_file, paths, chunksize=chunksize)))
+
+
+def share(method, tables, probs):
+    """
+    Initialize a worker process with the method, inheritance tables and
+    probabilities shared by all families.
+    """
+    heredity.INHERITANCE.update(tables)
+    shared["infer"] = METHODS[method]
+    shared["probs"] = probs
+
+
+def infer_file(path):
+    """
+    Return the `probabilities` dictionary of the family in file `path`.
+    """
+    return shared["infer"](heredity.load_data(path), shared["probs"])
+
+
+def write_results(results, output):
+    """
+    Write the distributions of every family in `results` to the file
+    `output`: as CSV, with one row per person, if its name ends in ".csv",
+    and as JSON, keyed by family file and then by person, otherwise.
+    """
+    if output.endswith(".csv"):
+        with open(output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["family", "name", "gene2", "gene1", "gene0", "trait"])
+            for path, probabilities in results.items():
+                for person, distributions in probabilities.items():
+                    writer.writerow([
+                        path, person,
+                        distributions["gene"][2],
+                        distributions["gene"][1],
+                        distributions["gene"][0],
+                        distributions["trait"][True]
+                    ])
+    else:
+        with open(output, "w") as f:
+            json.dump({
+                path: {
+                    person: {
+                        "gene": {
+                            str(genes): p
+                            for genes, p in distributions["gene"].items()
+                        },
+                        "trait": distributions["trait"][True]
+                    }
+                    for person, distributions in probabilities.items()
+                }
+                for path, probabilities in results.items()
+            }, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
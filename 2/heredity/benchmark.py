@@ -0,0 +1,118 @@
+import argparse
+import multiprocessing
+import resource
+import time
+
+import elimination
+import heredity
+import sampling
+from pedigree import EVIDENCE, generate
+
+# Family sizes benchmarked by default
+SIZES = [5, 8, 10, 20, 50, 100, 200]
+
+# Largest family each method is run on; enumeration takes time exponential
+# in the number of people
+LIMITS = {
+    "enumerate": 10,
+    "elimination": 200,
+    "weighting": 10 ** 6,
+    "gibbs": 10 ** 6
+}
+
+# Methods whose results others are checked against, most trusted first
+REFERENCES = ["enumerate", "elimination"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare heredity inference methods on synthetic families."
+    )
+    parser.add_argument("sizes", nargs="*", type=int, default=SIZES,
+                        help="numbers of people, e.g. 10 1000")
+    parser.add_argument("-e", "--evidence", type=float, default=EVIDENCE,
+                        help="fraction of people whose trait is known")
+    parser.add_argument("-n", "--samples", type=int, default=sampling.SAMPLES,
+                        help="number of samples for the sampling methods")
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="seed for the family generator and samplers")
+    args = parser.parse_args()
+
+    print(f"{'people':>6} {'method':>12} {'time (s)':>10} {'memory (MB)':>12} "
+          f"{'max error':>10} {'against':>12}")
+    for size in args.sizes:
+        people = generate(size, args.evidence, seed=args.seed)
+        results = dict()
+        for method in LIMITS:
+            if size > LIMITS[method]:
+                continue
+            results[method], seconds, memory = measure(
+                method, people, args.samples, args.seed
+            )
+
+            # Compare with the most trusted exact method that was run
+            reference = next(
+                (r for r in REFERENCES if r in results and r != method), None
+            )
+            if reference is None:
+                error = ""
+            else:
+                error = f"{max_error(results[method], results[reference]):.2e}"
+            print(f"{size:>6} {method:>12} {seconds:>10.3f} "
+                  f"{memory / 1024:>12.1f} {error:>10} {reference or '':>12}")
+
+
+def measure(method, people, samples, seed):
+    """
+    Run inference method `method` on `people` in a worker process of its
+    own. The peak resident set size of a process never goes down, so the
+    tables an earlier method built (enumeration's especially) would
+    otherwise hide how much memory a later one needs.
+
+    Return a tuple (probabilities, seconds, memory), where memory is the
+    growth in peak resident set size while the method ran, in kilobytes.
+    """
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(run, (method, people, samples, seed))
+
+
+def run(method, people, samples, seed):
+    """
+    Return the tuple described in `measure` for `method` on `people`,
+    measured in the calling process. Sampling methods run their chains one
+    after another here, so that their time and memory are not spread over
+    processes this one cannot see.
+    """
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if method == "enumerate":
+        probabilities = heredity.infer(people)
+    elif method == "elimination":
+        probabilities = elimination.infer(people)
+    elif method == "weighting":
+        probabilities, _ = sampling.likelihood_weighting(
+            people, samples, processes=1, seed=seed
+        )
+    else:
+        probabilities, _ = sampling.gibbs_sampling(
+            people, samples, processes=1, seed=seed
+        )
+    seconds = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return probabilities, seconds, after - before
+
+
+def max_error(probabilities, reference):
+    """
+    Return the largest difference between a gene probability in
+    `probabilities` and the same one in `reference`.
+    """
+    return max(
+        abs(probabilities[person]["gene"][genes] - reference[person]["gene"][genes])
+        for person in reference
+        for genes in reference[person]["gene"]
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import itertools
+import sys
+
+from heredity import PROBS, inheritance_table, load_data, print_probabilities
+
+# Possible numbers of copies of the gene
+GENES = (0, 1, 2)
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python elimination.py data.csv")
+    people = load_data(sys.argv[1])
+
+    # Compute and print each person's exact gene and trait distributions
+    print_probabilities(infer(people))
+
+
+class Factor():
+    """
+    Nonnegative function of some gene variables, one per person, stored as
+    a table from tuples of gene counts (in the order of `variables`) to values.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    def value(self, assignment):
+        """
+        Return the value of the factor under `assignment`, a dictionary
+        mapping each of (at least) its variables to a gene count.
+        """
+        return self.table[tuple(assignment[v] for v in self.variables)]
+
+
+def pedigree_factors(people, probs=PROBS):
+    """
+    Return the factors of the pedigree's Bayesian network with the observed
+    traits absorbed: for each person, the probability of their genes (given
+    their parents' genes, if they have parents) times the probability of
+    their observed trait, if any, given their genes.
+    """
+    inheritance = inheritance_table(probs["mutation"])
+    factors = []
+    for name, person in people.items():
+
+        def evidence(genes):
+            if person["trait"] is None:
+                return 1
+            return probs["trait"][genes][person["trait"]]
+
+        if person["mother"] is None:
+            factors.append(Factor((name,), {
+                (genes,): probs["gene"][genes] * evidence(genes)
+                for genes in GENES
+            }))
+        else:
+            factors.append(Factor((name, person["mother"], person["father"]), {
+                (genes, mother, father):
+                    inheritance[mother][father][genes] * evidence(genes)
+                for genes in GENES for mother in GENES for father in GENES
+            }))
+    return factors
+
+
+def marginalize(factors, variables):
+    """
+    Return a factor over `variables` equal to the product of `factors`,
+    summed over every value of their other variables.
+    """
+    variables = tuple(variables)
+    others = []
+    for factor in factors:
+        for v in factor.variables:
+            if v not in variables and v not in others:
+                others.append(v)
+
+    table = dict()
+    for values in itertools.product(GENES, repeat=len(variables)):
+        assignment = dict(zip(variables, values))
+        total = 0
+        for rest in itertools.product(GENES, repeat=len(others)):
+            assignment.update(zip(others, rest))
+            product = 1
+            for factor in factors:
+                product *= factor.value(assignment)
+                if product == 0:
+                    break
+            total += product
+        table[values] = total
+    return Factor(variables, table)
+
+
+def sum_out(factors, variable):
+    """
+    Return a factor over the other variables of `factors` equal to their
+    product, summed over every value of `variable`.
+    """
+    variables = []
+    for factor in factors:
+        for v in factor.variables:
+            if v != variable and v not in variables:
+                variables.append(v)
+    return marginalize(factors, variables)
+
+
+def elimination_order(factors):
+    """
+    Return an order in which to eliminate the variables of `factors`,
+    greedily choosing next the variable whose elimination creates the
+    fewest new links between the remaining variables (min-fill).
+    """
+    neighbors = dict()
+    for factor in factors:
+        for v in factor.variables:
+            neighbors.setdefault(v, set()).update(factor.variables)
+            neighbors[v].discard(v)
+
+    order = []
+    remaining = set(neighbors)
+    while remaining:
+
+        def fill(v):
+            adjacent = list(neighbors[v])
+            return sum(
+                1 for a, b in itertools.combinations(adjacent, 2)
+                if b not in neighbors[a]
+            )
+
+        variable = min(remaining, key=lambda v: (fill(v), len(neighbors[v]), v))
+        adjacent = neighbors.pop(variable)
+        for v in adjacent:
+            neighbors[v].discard(variable)
+            neighbors[v].update(adjacent - {v})
+        remaining.remove(variable)
+        order.append(variable)
+    return order
+
+
+def gene_marginals(factors, order):
+    """
+    Return a dictionary mapping each variable of `factors` to its
+    distribution given the evidence in them, from two passes over the
+    clusters formed by eliminating the variables in `order`.
+
+    Eliminating a variable combines the factors that mention it, a
+    cluster, and passes the sum over the variable on to the cluster of the
+    next of its neighbors to be eliminated. Those clusters form a tree:
+    the upward pass is plain variable elimination, and the downward pass
+    sends each cluster what the rest of the tree says about its neighbors,
+    so every variable's distribution comes from its own cluster at once
+    rather than from a separate elimination per variable.
+    """
+    # Upward pass, remembering the original factors each cluster absorbs
+    # and the clusters whose messages it absorbs
+    local = dict()
+    children = dict()
+    up = dict()
+    pending = [(factor, None) for factor in factors]
+    for variable in order:
+        involved = [(f, s) for f, s in pending if variable in f.variables]
+        pending = [(f, s) for f, s in pending if variable not in f.variables]
+        local[variable] = [f for f, s in involved if s is None]
+        children[variable] = [s for f, s in involved if s is not None]
+        up[variable] = sum_out([f for f, _ in involved], variable)
+        pending.append((up[variable], variable))
+
+    # Downward pass, from the last cluster eliminated to the first
+    down = dict()
+    marginals = dict()
+    for variable in reversed(order):
+        incoming = local[variable] + [up[child] for child in children[variable]]
+        if variable in down:
+            incoming.append(down[variable])
+        for child in children[variable]:
+            others = [f for f in incoming if f is not up[child]]
+            down[child] = marginalize(others, up[child].variables)
+
+        belief = marginalize(incoming, (variable,))
+        total = sum(belief.table.values())
+        marginals[variable] = {
+            genes: belief.table[(genes,)] / total for genes in GENES
+        }
+    return marginals
+
+
+def infer(people, probs=PROBS):
+    """
+    Return each person's gene and trait distributions given the observed
+    traits, in the format of the `probabilities` dictionary of `heredity.main`,
+    computed exactly by variable elimination on the pedigree.
+
+    The cost grows with the size of the largest factor created, which
+    for family trees stays small, rather than exponentially with the
+    number of people as enumerating every assignment does.
+    """
+    factors = pedigree_factors(people, probs)
+    marginals = gene_marginals(factors, elimination_order(factors))
+    probabilities = dict()
+    for person in people:
+        genes = marginals[person]
+        trait = people[person]["trait"]
+        if trait is None:
+            have_trait = sum(
+                genes[g] * probs["trait"][g][True] for g in GENES
+            )
+        else:
+            have_trait = 1 if trait else 0
+        probabilities[person] = {
+            "gene": {2: genes[2], 1: genes[1], 0: genes[0]},
+            "trait": {True: have_trait, False: 1 - have_trait}
+        }
+    return probabilities
+
+
+if __name__ == "__main__":
+    main()
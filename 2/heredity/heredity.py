@@ -44,48 +44,51 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
+    # Compute and print each person's gene and trait distributions
+    print_probabilities(infer(people))
+
+
+def infer(people, probs=PROBS):
+    """
+    Return each person's gene and trait distributions given the observed
+    traits, by enumerating every assignment that could have happened.
+    """
+
     # Keep track of gene and trait probabilities for each person
+    order = topological_order(people)
+    gene_totals = [[0] * 3 for _ in order]
+    trait_totals = [[0] * 2 for _ in order]
+
+    # Loop over all assignments of genes and traits that could have happened
+    for genes, traits, p in assignments(people, order, probs):
+        accumulate(gene_totals, trait_totals, genes, traits, p)
+
+    index = {person: i for i, person in enumerate(order)}
     probabilities = {
         person: {
             "gene": {
-                2: 0,
-                1: 0,
-                0: 0
+                2: gene_totals[index[person]][2],
+                1: gene_totals[index[person]][1],
+                0: gene_totals[index[person]][0]
             },
             "trait": {
-                True: 0,
-                False: 0
+                True: trait_totals[index[person]][1],
+                False: trait_totals[index[person]][0]
             }
         }
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
-
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
+
 
-    # Print results
-    for person in people:
+def print_probabilities(probabilities):
+    """
+    Print each person's gene and trait distributions.
+    """
+    for person in probabilities:
         print(f"{person}:")
         for field in probabilities[person]:
             print(f"  {field.capitalize()}:")
@@ -127,81 +130,125 @@ def powerset(s):
         )
     ]
 
-def calculate_gene_probability_with_parents(person_name, people, one_gene, two_genes, have_trait):
-    # set some constants
-    father = people[person_name]["father"]
-    mother = people[person_name]["mother"]
-    zero_genes = set()
-    if father not in one_gene and father not in two_genes:
-        zero_genes.add(father)
-    if mother not in one_gene and mother not in two_genes:
-        zero_genes.add(mother)
-    mutation = PROBS["mutation"] # probability of mutation
-    # go through all cases and figure out probability of each
-    probability = 0
-    if person_name in two_genes:
-        if father in two_genes and mother in two_genes:
-            probability += (1 - mutation) * (1 - mutation)
-        elif father in one_gene and mother in one_gene:
-            probability += .5 * (1 - mutation) * .5 * (1 - mutation)
-            probability += .5 * mutation * .5 * (1 - mutation)
-            probability += .5 * (1 - mutation) * .5 * mutation
-            probability += .5 * mutation * .5 * mutation
-        elif father in zero_genes and mother in zero_genes:
-            probability += mutation * mutation
-        elif (father in one_gene and mother in two_genes) or (father in two_genes and mother in one_gene):
-            probability += .5 * (1 - mutation) * (1 - mutation)
-            probability += .5 * mutation * (1 - mutation)
-        elif (father in two_genes and mother in zero_genes) or (father in zero_genes and mother in two_genes):
-            probability += (1 - mutation) * mutation
-        elif (father in one_gene and mother in zero_genes) or (father in zero_genes and mother in one_gene):
-            probability += .5 * (1 - mutation) * mutation
-            probability += .5 * mutation * mutation
-    elif person_name in one_gene:
-        if father in two_genes and mother in two_genes:
-            probability += (1 - mutation) * mutation
-            probability += mutation * (1 - mutation)
-        elif father in one_gene and mother in one_gene:
-            probability += .5 * mutation * .5 * mutation
-            probability += .5 * mutation * .5 * mutation
-            probability += .5 * (1 - mutation) * .5 * (1 - mutation)
-            probability += .5 * (1 - mutation) * .5 * (1 - mutation)
-            probability += .5 * (1 - mutation) * .5 * mutation
-            probability += .5 * (1 - mutation) * .5 * mutation
-            probability += .5 * (1 - mutation) * .5 * mutation
-            probability += .5 * (1 - mutation) * .5 * mutation
-        elif father in zero_genes and mother in zero_genes:
-            probability += mutation * (1 - mutation)
-            probability += (1 - mutation) * mutation
-        elif (father in one_gene and mother in two_genes) or (father in two_genes and mother in one_gene):
-            probability += .5 * (1 - mutation) * mutation
-            probability += .5 * (1 - mutation) * (1 - mutation)
-        elif (father in two_genes and mother in zero_genes) or (father in zero_genes and mother in two_genes):
-            probability += (1 - mutation) * (1 - mutation)
-            probability += mutation * mutation
-        elif (father in one_gene and mother in zero_genes) or (father in zero_genes and mother in one_gene):
-            probability += .5 * (1 - mutation) * (1 - mutation)
-            probability += .5 * (1 - mutation) * mutation
-            probability += .5 * mutation * (1 - mutation)
-    else:
-        if father in two_genes and mother in two_genes:
-            probability += mutation * mutation
-        elif father in one_gene and mother in one_gene:
-            probability += .5 * (1 - mutation) * .5 * (1 - mutation)
-            probability += .5 * mutation * .5 * (1 - mutation)
-            probability += .5 * (1 - mutation) * .5 * mutation
-            probability += .5 * mutation * .5 * mutation
-        elif father in zero_genes and mother in zero_genes:
-            probability += (1 - mutation) * (1 - mutation)
-        elif (father in one_gene and mother in two_genes) or (father in two_genes and mother in one_gene):
-            probability += .5 * (1 - mutation) * mutation
-            probability += .5 * mutation * mutation
-        elif (father in two_genes and mother in zero_genes) or (father in zero_genes and mother in two_genes):
-            probability += mutation * (1 - mutation)
-        elif (father in one_gene and mother in zero_genes) or (father in zero_genes and mother in one_gene):
-            probability += .5 * mutation * (1 - mutation)
-            probability += .5 * (1 - mutation) * (1 - mutation)
-    return probability
+def topological_order(people):
+    """
+    Return a list of the names of `people` in which everyone comes after
+    their parents.
+    """
+    order = []
+    placed = set()
+
+    def place(name):
+        if name in placed:
+            return
+        for parent in (people[name]["mother"], people[name]["father"]):
+            if parent is not None:
+                place(parent)
+        placed.add(name)
+        order.append(name)
+
+    for name in people:
+        place(name)
+    return order
+
+
+def assignments(people, order=None, probs=PROBS):
+    """
+    Generate every assignment of genes and traits to `people` that agrees
+    with the known traits and has nonzero probability, as tuples
+    (genes, traits, p):
+        * `genes` is an integer whose ith base-3 digit is the number of
+          copies of the gene of the ith person in `order`,
+        * `traits` is a bitmask whose ith bit is set if that person has
+          the trait, and
+        * `p` is the joint probability of the assignment.
+
+    People are assigned one at a time, parents before children (by default
+    in `topological_order`), so the probability is built up as a running
+    product and a branch is abandoned as soon as it becomes impossible.
+    """
+    if order is None:
+        order = topological_order(people)
+    index = {name: i for i, name in enumerate(order)}
+    parents = [
+        None if people[name]["mother"] is None else
+        (index[people[name]["mother"]], index[people[name]["father"]])
+        for name in order
+    ]
+    traits = [
+        (False, True) if people[name]["trait"] is None else
+        (people[name]["trait"],)
+        for name in order
+    ]
+    inheritance = inheritance_table(probs["mutation"])
+    genes = [0] * len(order)
+
+    def extend(i, code, mask, p):
+        if i == len(order):
+            yield code, mask, p
+            return
+        if parents[i] is None:
+            gene_probability = probs["gene"]
+        else:
+            mother, father = parents[i]
+            gene_probability = inheritance[genes[mother]][genes[father]]
+        for gene_number in range(3):
+            p_gene = p * gene_probability[gene_number]
+            if p_gene == 0:
+                continue
+            genes[i] = gene_number
+            for trait in traits[i]:
+                p_trait = p_gene * probs["trait"][gene_number][trait]
+                if p_trait == 0:
+                    continue
+                yield from extend(
+                    i + 1, code + gene_number * 3 ** i, mask | trait << i, p_trait
+                )
+
+    yield from extend(0, 0, 0, 1)
+
+
+def accumulate(gene_totals, trait_totals, genes, traits, p):
+    """
+    Add the joint probability `p` of an assignment encoded as by
+    `assignments` to each person's entry of `gene_totals` (a list of
+    three totals per person) and `trait_totals` (a list of two totals per
+    person, without and with the trait).
+    """
+    for i in range(len(gene_totals)):
+        genes, gene_number = divmod(genes, 3)
+        gene_totals[i][gene_number] += p
+        trait_totals[i][traits >> i & 1] += p
+
+
+# Inheritance tables computed so far, by mutation probability
+INHERITANCE = dict()
+
+
+def inheritance_table(mutation):
+    """
+    Return the conditional probability table of a child's number of genes
+    given its parents', as nested tuples indexed [mother][father][child],
+    computed once per mutation probability.
+
+    Each parent passes on one of its two copies at random, and the copy
+    passed on mutates (gains or loses the gene) with probability `mutation`.
+    """
+    if mutation not in INHERITANCE:
+        passes = (mutation, 0.5, 1 - mutation)
+        INHERITANCE[mutation] = tuple(
+            tuple(
+                (
+                    (1 - passes[mother]) * (1 - passes[father]),
+                    passes[mother] * (1 - passes[father]) +
+                    (1 - passes[mother]) * passes[father],
+                    passes[mother] * passes[father]
+                )
+                for father in range(3)
+            )
+            for mother in range(3)
+        )
+    return INHERITANCE[mutation]
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -215,24 +262,22 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    probability = 1
+    inheritance = inheritance_table(PROBS["mutation"])
+    genes = {
+        person: 2 if person in two_genes else 1 if person in one_gene else 0
+        for person in people
+    }
 
-    for person_name in people:
-        gene_number = (
-        2 if person_name in two_genes else
-        1 if person_name in one_gene else
-        0
-        )
-        # probability for gene
-        person = people[person_name]
+    probability = 1
+    for person_name, person in people.items():
+        gene_number = genes[person_name]
         mother = person["mother"]
         father = person["father"]
-        if father == None and mother == None:
+        if mother is None and father is None:
             probability *= PROBS["gene"][gene_number]
-            probability *= PROBS["trait"][gene_number][person_name in have_trait]
-        elif father != None and mother != None:
-            probability *= PROBS["trait"][gene_number][person_name in have_trait]
-            probability *= calculate_gene_probability_with_parents(person_name, people, one_gene, two_genes, have_trait)
+        else:
+            probability *= inheritance[genes[mother]][genes[father]][gene_number]
+        probability *= PROBS["trait"][gene_number][person_name in have_trait]
 
     return probability
 
@@ -0,0 +1,97 @@
+import csv
+import random
+import sys
+
+from heredity import PROBS, inheritance_table
+
+# Fraction of people whose trait is known
+EVIDENCE = 0.5
+
+# Number of people with no parents in the family that the first generation
+# is made of
+FOUNDERS = 4
+
+# Most children a couple has
+CHILDREN = 3
+
+
+def main():
+    if len(sys.argv) not in [4, 5]:
+        sys.exit("Usage: python pedigree.py people evidence data.csv [seed]")
+    size, evidence = int(sys.argv[1]), float(sys.argv[2])
+    seed = int(sys.argv[4]) if len(sys.argv) == 5 else None
+    people = generate(size, evidence, seed=seed)
+    write_pedigree(people, sys.argv[3])
+    known = sum(people[person]["trait"] is not None for person in people)
+    print(f"Wrote {len(people)} people, {known} with known traits, to {sys.argv[3]}")
+
+
+def generate(size, evidence=EVIDENCE, founders=FOUNDERS, children=CHILDREN,
+             seed=None, probs=PROBS):
+    """
+    Return a family of `size` people spanning as many generations as it
+    takes, in the format returned by `heredity.load_data`.
+
+    The first generation is `founders` people with no parents. Each later
+    generation is the children of random couples from the one before,
+    between one and `children` per couple, plus as many people with no
+    parents who marry into the family.
+
+    Everyone's genes and traits are drawn from the model in `probs`, and
+    each trait is then kept as known with probability `evidence`.
+    """
+    rng = random.Random(seed)
+    inheritance = inheritance_table(probs["mutation"])
+    people = dict()
+    genes = dict()
+
+    def add(mother=None, father=None):
+        name = f"Person{len(people)}"
+        if mother is None:
+            distribution = [probs["gene"][g] for g in range(3)]
+        else:
+            distribution = inheritance[genes[mother]][genes[father]]
+        genes[name] = rng.choices(range(3), weights=distribution)[0]
+        trait = rng.random() < probs["trait"][genes[name]][True]
+        people[name] = {
+            "name": name,
+            "mother": mother,
+            "father": father,
+            "trait": trait if rng.random() < evidence else None
+        }
+        return name
+
+    generation = [add() for _ in range(min(size, max(2, founders)))]
+    while len(people) < size:
+        rng.shuffle(generation)
+        offspring = []
+        for mother, father in zip(generation[::2], generation[1::2]):
+            for _ in range(rng.randint(1, children)):
+                if len(people) < size:
+                    offspring.append(add(mother, father))
+        spouses = [add() for _ in range(min(len(offspring), size - len(people)))]
+        generation = offspring + spouses
+        if len(generation) < 2:
+            generation.extend(add() for _ in range(min(2, size - len(people))))
+    return people
+
+
+def write_pedigree(people, filename):
+    """
+    Write a family in the format returned by `heredity.load_data` to the
+    CSV file `filename`, so that `load_data` reads back the same family.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "mother", "father", "trait"])
+        for person in people.values():
+            writer.writerow([
+                person["name"],
+                person["mother"] or "",
+                person["father"] or "",
+                "" if person["trait"] is None else int(person["trait"])
+            ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import math
+import random
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+from heredity import (PROBS, inheritance_table, load_data, print_probabilities,
+                      topological_order)
+
+# Total number of samples (or Gibbs sweeps) taken over all chains
+SAMPLES = 10000
+
+# Number of independent chains
+CHAINS = 4
+
+# Number of batches each chain's samples are split into for the diagnostics
+BATCHES = 20
+
+# Number of Gibbs sweeps each chain discards before it starts counting
+BURN_IN = 200
+
+# Pedigree shared by the chains of a worker process
+shared = dict()
+
+
+def main():
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python sampling.py (weighting | gibbs) data.csv "
+                 "[samples] [chains]")
+    method = sys.argv[1]
+    people = load_data(sys.argv[2])
+    samples = int(sys.argv[3]) if len(sys.argv) > 3 else SAMPLES
+    chains = int(sys.argv[4]) if len(sys.argv) > 4 else CHAINS
+    if method not in ["weighting", "gibbs"]:
+        sys.exit(f"Unknown method {method}")
+    try:
+        if method == "weighting":
+            probabilities, diagnostics = likelihood_weighting(people, samples, chains)
+        else:
+            probabilities, diagnostics = gibbs_sampling(people, samples, chains)
+    except ValueError as error:
+        sys.exit(str(error))
+
+    print_probabilities(probabilities)
+    ess = min(diagnostics, key=lambda person: diagnostics[person]["ess"])
+    rhat = max(diagnostics, key=lambda person: diagnostics[person]["rhat"])
+    print(f"{samples} samples in {chains} chains")
+    print(f"Smallest effective sample size: "
+          f"{diagnostics[ess]['ess']:.0f} ({ess})")
+    print(f"Largest R-hat: {diagnostics[rhat]['rhat']:.4f} ({rhat})")
+
+
+class Pedigree():
+    """
+    The Bayesian network of a family under `PROBS`-style probabilities,
+    with people numbered parents first and their observed traits turned
+    into a likelihood of each number of genes.
+    """
+
+    def __init__(self, people, probs=PROBS):
+        self.people = people
+        self.order = topological_order(people)
+        index = {name: i for i, name in enumerate(self.order)}
+        self.parents = [
+            None if people[name]["mother"] is None else
+            (index[people[name]["mother"]], index[people[name]["father"]])
+            for name in self.order
+        ]
+        self.children = [[] for _ in self.order]
+        for child, parents in enumerate(self.parents):
+            if parents is not None:
+                for parent in set(parents):
+                    self.children[parent].append(child)
+        self.evidence = [
+            (1, 1, 1) if people[name]["trait"] is None else
+            tuple(probs["trait"][genes][people[name]["trait"]] for genes in range(3))
+            for name in self.order
+        ]
+        self.gene = tuple(probs["gene"][genes] for genes in range(3))
+        self.trait = tuple(probs["trait"][genes][True] for genes in range(3))
+        self.inheritance = inheritance_table(probs["mutation"])
+
+    def prior(self, i, genes):
+        """
+        Return the probabilities of each number of genes for person `i`
+        given their parents' numbers of genes in `genes`.
+        """
+        if self.parents[i] is None:
+            return self.gene
+        mother, father = self.parents[i]
+        return self.inheritance[genes[mother]][genes[father]]
+
+    def weighted_sample(self, rng):
+        """
+        Return a list of numbers of genes drawn from the prior, parents
+        first, and its weight: the likelihood of the observed traits.
+        """
+        genes = [0] * len(self.order)
+        weight = 1
+        for i in range(len(self.order)):
+            genes[i] = choose(self.prior(i, genes), rng)
+            weight *= self.evidence[i][genes[i]]
+        return genes, weight
+
+    def conditional(self, i, genes):
+        """
+        Return the unnormalized probabilities of each number of genes for
+        person `i` given everyone else's numbers of genes in `genes` and
+        the observed traits: their prior times the likelihood of their trait
+        times the probability of each of their children's genes.
+        """
+        weights = [
+            p * likelihood for p, likelihood in zip(self.prior(i, genes), self.evidence[i])
+        ]
+        for child in self.children[i]:
+            mother, father = self.parents[child]
+            for g in range(3):
+                weights[g] *= self.inheritance[
+                    g if mother == i else genes[mother]
+                ][
+                    g if father == i else genes[father]
+                ][genes[child]]
+        return weights
+
+    def probabilities(self, estimates):
+        """
+        Return each person's gene and trait distributions, in the format of
+        the `probabilities` dictionary of `heredity.main`, from a list of
+        each person's estimated gene distribution.
+        """
+        probabilities = dict()
+        for name in self.people:
+            genes = estimates[self.order.index(name)]
+            trait = self.people[name]["trait"]
+            if trait is None:
+                have_trait = sum(genes[g] * self.trait[g] for g in range(3))
+            else:
+                have_trait = 1 if trait else 0
+            probabilities[name] = {
+                "gene": {2: genes[2], 1: genes[1], 0: genes[0]},
+                "trait": {True: have_trait, False: 1 - have_trait}
+            }
+        return probabilities
+
+
+def likelihood_weighting(people, samples=SAMPLES, chains=CHAINS,
+                         processes=None, seed=None, probs=PROBS):
+    """
+    Estimate each person's gene and trait distributions given the observed
+    traits by likelihood weighting: draw everyone's genes from the prior,
+    parents first, and weight each draw by the likelihood of the observed
+    traits.
+
+    The `samples` draws are split over `chains` independent chains run
+    across a pool of `processes` worker processes (or in this process, if
+    `processes` is 1), each with its own random number generator derived
+    from `seed`.
+
+    Return a tuple (probabilities, diagnostics) as described in `combine`.
+    """
+    return run_chains(
+        Pedigree(people, probs), weighting_chain, (), samples, chains,
+        processes, seed
+    )
+
+
+def gibbs_sampling(people, samples=SAMPLES, chains=CHAINS, burn_in=BURN_IN,
+                   processes=None, seed=None, probs=PROBS):
+    """
+    Estimate each person's gene and trait distributions given the observed
+    traits by Gibbs sampling: starting from a draw from the prior, redraw
+    each person's genes in turn from their distribution given everyone
+    else's, and average those distributions over `samples` sweeps.
+
+    Unlike likelihood weighting, every sweep agrees with the evidence, so
+    accuracy does not collapse when many traits are observed, but
+    consecutive sweeps are correlated. Each of the `chains` chains first
+    discards `burn_in` sweeps. Chains are run as in `likelihood_weighting`.
+
+    Return a tuple (probabilities, diagnostics) as described in `combine`.
+    """
+    return run_chains(
+        Pedigree(people, probs), gibbs_chain, (burn_in,), samples, chains,
+        processes, seed
+    )
+
+
+def run_chains(pedigree, chain, arguments, samples, chains, processes, seed):
+    """
+    Run `chains` chains of `chain` on `pedigree`, splitting `samples`
+    samples between them, and combine their results.
+    """
+    if chains < 2:
+        raise ValueError("At least two chains are needed for diagnostics")
+    if samples < chains:
+        raise ValueError("At least one sample is needed for each chain")
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    seeds = [f"{seed}:{i}" for i in range(chains)]
+    columns = [seeds, split(samples, chains)]
+    columns.extend([argument] * chains for argument in arguments)
+
+    # Run the chains one after another if only one process is wanted
+    if processes == 1:
+        share(pedigree)
+        results = list(map(chain, *columns))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=share, initargs=(pedigree,)
+        ) as executor:
+            results = list(executor.map(chain, *columns))
+    return combine(pedigree, results)
+
+
+def share(pedigree):
+    """
+    Initialize a worker process with the pedigree shared by all chains.
+    """
+    shared["pedigree"] = pedigree
+
+
+def weighting_chain(seed, samples):
+    """
+    Run one chain of likelihood weighting for `samples` samples.
+
+    Return a list of batches, each a tuple (weight, totals) of the total
+    weight of its samples and the total weight of each person's number of
+    genes.
+    """
+    pedigree = shared["pedigree"]
+    rng = random.Random(seed)
+    batches = []
+    for size in split(samples, BATCHES):
+        weight = 0
+        totals = [[0, 0, 0] for _ in pedigree.order]
+        for _ in range(size):
+            genes, w = pedigree.weighted_sample(rng)
+            weight += w
+            for i, g in enumerate(genes):
+                totals[i][g] += w
+        batches.append((weight, totals))
+    return batches
+
+
+def gibbs_chain(seed, samples, burn_in):
+    """
+    Run one Gibbs chain for `burn_in` discarded sweeps and then `samples`
+    counted sweeps.
+
+    Return a list of batches in the format of `weighting_chain`, each sweep
+    weighing one. Rather than counting the genes drawn, each person's totals
+    add up the normalized distribution their genes were drawn from, which
+    has the same mean and less variance.
+    """
+    pedigree = shared["pedigree"]
+    rng = random.Random(seed)
+    genes = [0] * len(pedigree.order)
+    for i in range(len(genes)):
+        genes[i] = choose(pedigree.prior(i, genes), rng)
+
+    for _ in range(burn_in):
+        for i in range(len(genes)):
+            genes[i] = choose(pedigree.conditional(i, genes), rng)
+
+    batches = []
+    for size in split(samples, BATCHES):
+        totals = [[0, 0, 0] for _ in pedigree.order]
+        for _ in range(size):
+            for i in range(len(genes)):
+                weights = pedigree.conditional(i, genes)
+                total = sum(weights)
+                for g in range(3):
+                    totals[i][g] += weights[g] / total
+                genes[i] = choose(weights, rng)
+        batches.append((size, totals))
+    return batches
+
+
+def combine(pedigree, results):
+    """
+    Pool the batches of every chain into one estimate, and diagnose how far
+    it can be trusted from the spread of the batches' own estimates.
+
+    Return a tuple (probabilities, diagnostics): a dictionary in the format
+    of the `probabilities` dictionary of `heredity.main`, and a dictionary
+    mapping each person to a dictionary of
+        * "ess", the effective sample size of their least certain gene
+          probability: the number of independent exact draws that would
+          estimate it as precisely, and
+        * "rhat", the largest Gelman-Rubin statistic of their gene
+          probabilities, comparing the spread between chains to the spread
+          within them; values well above 1 mean the chains have not mixed.
+    """
+    n = len(pedigree.order)
+    weight = sum(w for batches in results for w, _ in batches)
+    estimates = [
+        [
+            sum(totals[i][g] for batches in results for _, totals in batches) / weight
+            for g in range(3)
+        ]
+        for i in range(n)
+    ]
+
+    diagnostics = dict()
+    for i, name in enumerate(pedigree.order):
+        ess = math.inf
+        rhat = 1
+        for g in range(3):
+            chains = [
+                [totals[i][g] / w for w, totals in batches if w > 0]
+                for batches in results
+            ]
+            means = [sum(chain) / len(chain) for chain in chains]
+            within = sum(
+                variance(chain, mean) for chain, mean in zip(chains, means)
+            ) / len(chains)
+            between = variance(means, sum(means) / len(means))
+
+            # Standard error of the estimate, from all batches pooled
+            pooled = [x for chain in chains for x in chain]
+            error = variance(pooled, estimates[i][g]) / len(pooled)
+            p = estimates[i][g]
+            if error > 0:
+                ess = min(ess, p * (1 - p) / error)
+            if within > 0:
+                length = min(len(chain) for chain in chains)
+                pooled_variance = (length - 1) / length * within + between
+                rhat = max(rhat, math.sqrt(pooled_variance / within))
+        diagnostics[name] = {"ess": ess, "rhat": rhat}
+
+    return pedigree.probabilities(estimates), diagnostics
+
+
+def variance(values, mean):
+    """
+    Return the sample variance of `values` about `mean`.
+    """
+    if len(values) < 2:
+        return 0
+    return sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+
+
+def choose(weights, rng):
+    """
+    Return an index into `weights` chosen with probability proportional
+    to its weight.
+    """
+    r = rng.random() * sum(weights)
+    for i, weight in enumerate(weights):
+        r -= weight
+        if r < 0:
+            return i
+    return len(weights) - 1
+
+
+def split(total, parts):
+    """
+    Return a list of `parts` integers as equal as possible adding up to
+    `total`.
+    """
+    return [total // parts + (i < total % parts) for i in range(parts)]
+
+
+if __name__ == "__main__":
+    main()
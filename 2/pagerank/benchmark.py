@@ -0,0 +1,108 @@
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from matrix import LinkGraph, power_iteration, matrix_pagerank
+from pagerank import DAMPING, SAMPLES, crawl, iterate_pagerank, sample_pagerank
+from synthetic import generate, write_corpus
+
+# Corpus sizes benchmarked by default
+SIZES = [100, 1000, 10000]
+
+# Tolerance of the reference solution accuracy is measured against
+REFERENCE_TOLERANCE = 1e-13
+
+# Largest corpus each method is run on; `iterate_pagerank` takes time
+# quadratic in the number of pages
+LIMITS = {
+    "sample": 10 ** 6,
+    "iterate": 2000,
+    "matrix": 10 ** 6
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare PageRank methods on synthetic corpora."
+    )
+    parser.add_argument("sizes", nargs="*", type=int, default=SIZES,
+                        help="numbers of pages, e.g. 100 1000000")
+    parser.add_argument("-m", "--model", choices=["pa", "rmat"], default="pa",
+                        help="preferential attachment or R-MAT link graph")
+    parser.add_argument("-n", "--samples", type=int, default=SAMPLES,
+                        help="number of samples for sample_pagerank")
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="seed for the corpus generator")
+    args = parser.parse_args()
+
+    print(f"{'pages':>8} {'links':>9} {'method':>8} {'time (s)':>10} "
+          f"{'memory (MB)':>12} {'L1 error':>10} {'max error':>10}")
+    for size in args.sizes:
+        corpus, crawl_time = build_corpus(args.model, size, args.seed)
+        links = sum(len(corpus[page]) for page in corpus)
+        graph = LinkGraph(corpus)
+        reference, iterations, residual = power_iteration(
+            graph, DAMPING, REFERENCE_TOLERANCE, max_iterations=10000
+        )
+        print(f"{size:>8} {links:>9} {'crawl':>8} {crawl_time:>10.3f}")
+
+        for method in LIMITS:
+            if size > LIMITS[method]:
+                continue
+            ranks, seconds, memory = measure(method, corpus, args.samples)
+            errors = np.abs(
+                np.array([ranks[page] for page in graph.pages]) - reference
+            )
+            print(f"{size:>8} {links:>9} {method:>8} {seconds:>10.3f} "
+                  f"{memory / 1024:>12.1f} {errors.sum():>10.2e} "
+                  f"{errors.max():>10.2e}")
+
+
+def build_corpus(model, size, seed):
+    """
+    Generate a corpus, write it out as HTML and crawl it back, so that the
+    benchmark exercises the same path as real corpora. Return the crawled
+    corpus and the time spent crawling it.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(generate(model, size, seed=seed), directory)
+        start = time.perf_counter()
+        corpus = crawl(directory)
+        return corpus, time.perf_counter() - start
+
+
+def measure(method, corpus, samples):
+    """
+    Run one PageRank method on `corpus` in a fresh process, so that its
+    peak memory can be told apart from everything else's.
+
+    Return a tuple (ranks, seconds, memory), where memory is the growth
+    in peak resident set size while the method ran, in kilobytes.
+    """
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(run, (method, corpus, samples))
+
+
+def run(method, corpus, samples):
+    """
+    Run one PageRank method on `corpus` and measure it (see `measure`).
+    """
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if method == "sample":
+        ranks = sample_pagerank(corpus, DAMPING, samples)
+    elif method == "iterate":
+        ranks = iterate_pagerank(corpus, DAMPING)
+    else:
+        ranks = matrix_pagerank(corpus, DAMPING)
+    seconds = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return ranks, seconds, after - before
+
+
+if __name__ == "__main__":
+    main()
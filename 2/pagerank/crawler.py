@@ -0,0 +1,136 @@
+import json
+import os
+import re
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+# Pattern matching the target of a link, as in `pagerank.crawl`
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Number of characters read from a file at a time
+CHUNK_SIZE = 1 << 16
+
+# Name of the link cache written inside a corpus directory by default
+CACHE = ".links.json"
+
+# Below this many files to parse, parsing is not worth a process pool
+PARALLEL_THRESHOLD = 64
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python crawler.py corpus")
+    corpus = cached_crawl(sys.argv[1])
+    links = sum(len(corpus[page]) for page in corpus)
+    print(f"{len(corpus)} pages, {links} links")
+
+
+def cached_crawl(directory, cache=None, processes=None):
+    """
+    Parse a directory of HTML pages and check for links to other pages,
+    like `pagerank.crawl`, reusing the links of unchanged pages.
+
+    The links found in each file are saved in a JSON cache (by default
+    `CACHE` inside `directory`) along with the file's modification time and
+    size, and only files that are new or whose time or size changed are
+    parsed again, in parallel across `processes` worker processes.
+
+    Return a dictionary where each key is a page, and values are
+    a set of all other pages in the corpus that are linked to by the page.
+    """
+    if cache is None:
+        cache = os.path.join(directory, CACHE)
+    entries = load_cache(cache)
+
+    # Find the pages whose cached links are missing or out of date
+    stats = dict()
+    stale = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".html") or not entry.is_file():
+            continue
+        stat = entry.stat()
+        stats[entry.name] = [stat.st_mtime_ns, stat.st_size]
+        cached = entries.get(entry.name)
+        if cached is None or cached["stat"] != stats[entry.name]:
+            stale.append(entry.name)
+
+    # Parse them, in parallel if there are enough of them
+    paths = [os.path.join(directory, filename) for filename in stale]
+    if len(paths) >= PARALLEL_THRESHOLD and processes != 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunksize = max(1, len(paths) // (4 * (os.cpu_count() or 1)))
+            parsed = list(executor.map(extract_links, paths, chunksize=chunksize))
+    else:
+        parsed = [extract_links(path) for path in paths]
+
+    # Forget deleted pages, and save the cache if anything changed
+    fresh = {filename: entries[filename] for filename in stats if filename in entries}
+    for filename, links in zip(stale, parsed):
+        fresh[filename] = {"stat": stats[filename], "links": sorted(links)}
+    if stale or len(fresh) != len(entries):
+        save_cache(cache, fresh)
+
+    # Only include links to other pages in the corpus
+    pages = dict()
+    for filename, entry in fresh.items():
+        pages[filename] = set(entry["links"]).intersection(stats)
+        pages[filename].discard(filename)
+    return pages
+
+
+def extract_links(path, chunk_size=CHUNK_SIZE):
+    """
+    Return the set of link targets in the HTML file at `path`, reading it
+    `chunk_size` characters at a time rather than all at once.
+    """
+    links = set()
+    tail = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            text = tail + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+
+            # Carry over a tag that may be cut off at the end of the chunk
+            start = text.rfind("<", end)
+            if start != -1 and text.find(">", start) == -1:
+                tail = text[start:]
+            else:
+                tail = ""
+    return links
+
+
+def load_cache(cache):
+    """
+    Return the cached links saved at path `cache`, or an empty dictionary
+    if there is no readable cache there.
+    """
+    try:
+        with open(cache) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def save_cache(cache, entries):
+    """
+    Save cached links to path `cache`, replacing the file atomically so
+    that an interrupted crawl never leaves a truncated cache behind.
+    """
+    temporary = cache + ".tmp"
+    try:
+        with open(temporary, "w") as f:
+            json.dump(entries, f)
+        os.replace(temporary, cache)
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+import sys
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
+
+from pagerank import DAMPING, crawl
+
+# Iteration stops once the L1 norm of the change in ranks is below this
+TOLERANCE = 1e-10
+
+# Iteration stops after this many sweeps even if not converged
+MAX_ITERATIONS = 1000
+
+# Number of power iterations between two extrapolation steps
+EXTRAPOLATION_PERIOD = 10
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python matrix.py corpus [method | ranks.npz]\n"
+                 "With ranks.npz, power iteration starts from the ranks "
+                 "saved there, but every sweep still covers all pages")
+    corpus = crawl(sys.argv[1])
+    if len(sys.argv) == 3 and sys.argv[2] in METHODS:
+        graph = LinkGraph(corpus)
+        vector, iterations, residual = METHODS[sys.argv[2]](graph, DAMPING)
+        ranks = graph.ranks(vector)
+        print(f"PageRank Results from {sys.argv[2]} "
+              f"({iterations} iterations, residual {residual:.2e})")
+    elif len(sys.argv) == 3:
+        ranks = warm_start_pagerank(corpus, DAMPING, sys.argv[2])
+        print(f"PageRank Results from Power Iteration (warm start)")
+    else:
+        ranks = matrix_pagerank(corpus, DAMPING)
+        print(f"PageRank Results from Power Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+class LinkGraph():
+    """
+    Link structure of a corpus as a sparse transition matrix.
+
+    Pages are numbered in sorted order. `matrix` is a CSR matrix where
+    `matrix[i, j]` is the probability of following a link from page j to
+    page i, so that one step of the random surfer is `matrix @ ranks`.
+    Pages without links (dangling pages) have all-zero columns, and are
+    instead handled as a rank-one correction spreading their rank evenly.
+    """
+
+    def __init__(self, corpus):
+        self.pages = sorted(corpus)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        n = len(self.pages)
+
+        # One entry per link, from column `source` to row `target`
+        sources = []
+        targets = []
+        for page, links in corpus.items():
+            for link in links:
+                sources.append(self.index[page])
+                targets.append(self.index[link])
+        sources = np.array(sources, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int64)
+
+        self.out_degree = np.bincount(sources, minlength=n)
+        self.dangling = self.out_degree == 0
+        weights = 1 / self.out_degree[sources]
+        self.matrix = sparse.csr_matrix(
+            (weights, (targets, sources)), shape=(n, n)
+        )
+
+    def __len__(self):
+        return len(self.pages)
+
+    def step(self, ranks, damping_factor, teleport=None):
+        """
+        Return the distribution after one step of the random surfer from
+        `ranks`. With probability `1 - damping_factor`, or from a dangling
+        page, the surfer jumps to a page drawn from `teleport`, which
+        defaults to the uniform distribution.
+        """
+        dangling_rank = ranks[self.dangling].sum()
+        jump = (1 - damping_factor) * ranks.sum() + damping_factor * dangling_rank
+        if teleport is None:
+            return damping_factor * (self.matrix @ ranks) + jump / len(self)
+        return damping_factor * (self.matrix @ ranks) + jump * teleport
+
+    def teleports(self, distributions):
+        """
+        Return a matrix with one row per teleport distribution, built from
+        a list of dictionaries mapping pages to (unnormalized) weights, or
+        of collections of pages to teleport to with equal probability.
+        """
+        matrix = np.zeros((len(distributions), len(self)))
+        for row, distribution in enumerate(distributions):
+            if not isinstance(distribution, dict):
+                distribution = {page: 1 for page in distribution}
+            for page, weight in distribution.items():
+                matrix[row, self.index[page]] = weight
+            total = matrix[row].sum()
+            if total <= 0:
+                raise ValueError(f"Teleport distribution {row} is empty")
+            matrix[row] /= total
+        return matrix
+
+    def ranks(self, vector):
+        """
+        Return a dictionary mapping each page to its value in `vector`.
+        """
+        return {page: float(value) for page, value in zip(self.pages, vector)}
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, ranks=None):
+    """
+    Repeatedly apply the random surfer step to `ranks` (by default the
+    uniform distribution) until the L1 norm of the change is below
+    `tolerance`.
+
+    Return a tuple (ranks, iterations, residual) with the final rank
+    vector, the number of steps taken and the L1 norm of the last change.
+    """
+    n = len(graph)
+    if ranks is None:
+        ranks = np.full(n, 1 / n)
+    residual = np.inf
+    iterations = 0
+    while iterations < max_iterations and residual >= tolerance:
+        new_ranks = graph.step(ranks, damping_factor)
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        iterations += 1
+    return ranks, iterations, residual
+
+
+def gauss_seidel(graph, damping_factor, tolerance=TOLERANCE,
+                 max_iterations=MAX_ITERATIONS, ranks=None):
+    """
+    Solve the PageRank equations by Gauss-Seidel sweeps: each page's rank
+    is updated from the ranks of the pages linking to it, using values
+    already updated earlier in the same sweep. Stops once the L1 norm of
+    the residual, `graph.step(ranks) - ranks`, is below `tolerance`.
+
+    A sweep is one sparse triangular solve: links from earlier pages (and
+    self-links) form the lower triangle solved for, while links from later
+    pages and the jumps from dangling pages and teleportation take their
+    values from the previous sweep.
+
+    Return a tuple (ranks, iterations, residual) like `power_iteration`.
+    """
+    n = len(graph)
+    if ranks is None:
+        ranks = np.full(n, 1 / n)
+    lower = (
+        sparse.identity(n, format="csc")
+        - damping_factor * sparse.tril(graph.matrix, format="csc")
+    )
+    upper = damping_factor * sparse.triu(graph.matrix, k=1, format="csr")
+
+    # Factoring a triangular matrix in its own order without pivoting adds
+    # no entries, so each solve is one pass over the lower triangle; unlike
+    # `spsolve_triangular`, this checks and converts the matrix only once
+    sweep = linalg.splu(
+        lower, permc_spec="NATURAL", diag_pivot_thresh=0,
+        options={"SymmetricMode": True}
+    )
+
+    def jump(ranks):
+        return (
+            (1 - damping_factor) * ranks.sum()
+            + damping_factor * ranks[graph.dangling].sum()
+        ) / n
+
+    # The part of a step taken from the previous sweep
+    previous = upper @ ranks + jump(ranks)
+    residual = np.abs(graph.step(ranks, damping_factor) - ranks).sum()
+    iterations = 0
+    while iterations < max_iterations and residual >= tolerance:
+        ranks = sweep.solve(previous)
+
+        # The solution sums to 1; rescaling removes the error in total
+        # rank, which sweeps alone only shrink by `damping_factor` each time
+        total = ranks.sum()
+        ranks /= total
+
+        # The sweep made the lower-triangle part of a step from `ranks`
+        # equal to `ranks` minus `previous / total`, so the residual needs
+        # only the other part
+        current = upper @ ranks + jump(ranks)
+        residual = np.abs(current - previous / total).sum()
+        previous = current
+        iterations += 1
+    return ranks, iterations, residual
+
+
+def extrapolated_power_iteration(graph, damping_factor, tolerance=TOLERANCE,
+                                 max_iterations=MAX_ITERATIONS, ranks=None,
+                                 extrapolation="quadratic",
+                                 period=EXTRAPOLATION_PERIOD):
+    """
+    Power iteration that, every `period` steps, jumps ahead by extrapolating
+    the last few iterates towards their limit, either with Aitken's delta
+    squared process applied to each page ("aitken") or with quadratic
+    extrapolation ("quadratic"), which assumes the error is mostly made of
+    the two largest non-principal eigenvectors.
+
+    Return a tuple (ranks, iterations, residual) like `power_iteration`.
+    """
+    if extrapolation not in ["aitken", "quadratic"]:
+        raise ValueError(f"Unknown extrapolation {extrapolation!r}")
+    n = len(graph)
+    if ranks is None:
+        ranks = np.full(n, 1 / n)
+    history = [ranks]
+    residual = np.inf
+    iterations = 0
+    while iterations < max_iterations and residual >= tolerance:
+        new_ranks = graph.step(ranks, damping_factor)
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        iterations += 1
+        history = history[-3:] + [ranks]
+        if iterations % period == 0 and residual >= tolerance:
+            if extrapolation == "aitken":
+                extrapolated = aitken(history[-3:])
+            else:
+                extrapolated = quadratic_extrapolation(history)
+            if extrapolated is not None:
+                ranks = extrapolated
+                history = [ranks]
+    return ranks, iterations, residual
+
+
+def aitken(iterates):
+    """
+    Return Aitken's extrapolation of three consecutive iterates, for each
+    page, or None if it does not give a valid distribution.
+    """
+    if len(iterates) < 3:
+        return None
+    x0, x1, x2 = iterates
+    denominator = x2 - 2 * x1 + x0
+    change = (x2 - x1) ** 2
+    safe = np.abs(denominator) > 1e-15
+    ranks = x2.copy()
+    ranks[safe] -= change[safe] / denominator[safe]
+    if np.any(ranks < 0) or not np.all(np.isfinite(ranks)):
+        return None
+    return ranks / ranks.sum()
+
+
+def quadratic_extrapolation(iterates):
+    """
+    Return the quadratic extrapolation of four consecutive iterates
+    (Kamvar et al., 2003), or None if it does not give a valid distribution.
+    """
+    if len(iterates) < 4:
+        return None
+    x0, x1, x2, x3 = iterates
+    y1 = x1 - x0
+    y2 = x2 - x0
+    y3 = x3 - x0
+
+    # Least-squares fit of the coefficients of the minimal polynomial
+    gamma, *_ = np.linalg.lstsq(np.column_stack([y1, y2]), -y3, rcond=None)
+    gamma1, gamma2 = gamma
+    beta0 = gamma1 + gamma2 + 1
+    beta1 = gamma2 + 1
+    beta2 = 1
+    ranks = beta0 * x1 + beta1 * x2 + beta2 * x3
+    if np.any(ranks < 0) or not np.all(np.isfinite(ranks)) or ranks.sum() <= 0:
+        return None
+    return ranks / ranks.sum()
+
+
+def personalized_pagerank(graph, damping_factor, teleports,
+                          tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Compute personalized PageRank for many teleport distributions at once.
+
+    `teleports` is a matrix with one distribution over the pages of `graph`
+    per row (see `LinkGraph.teleports`). The random surfer of row k jumps
+    according to row k, both when not following a link and when on a page
+    without links. All rows are iterated together, so every step is one
+    sparse-times-dense product sharing the transition matrix.
+
+    Return a tuple (ranks, iterations, residuals): a matrix with the rank
+    vector of each teleport distribution as its rows, the number of steps
+    taken and the L1 norm of each row's last change.
+    """
+    teleports = np.atleast_2d(np.asarray(teleports, dtype=float))
+    if teleports.shape[1] != len(graph):
+        raise ValueError("Teleport distributions must have one entry per page")
+
+    # Work with one column per distribution, as `matrix @ ranks` expects
+    jumps = teleports.T
+    ranks = jumps.copy()
+    residuals = np.full(len(teleports), np.inf)
+    iterations = 0
+    while iterations < max_iterations and residuals.max() >= tolerance:
+        jump = (
+            (1 - damping_factor) * ranks.sum(axis=0)
+            + damping_factor * ranks[graph.dangling].sum(axis=0)
+        )
+        new_ranks = damping_factor * (graph.matrix @ ranks) + jumps * jump
+        residuals = np.abs(new_ranks - ranks).sum(axis=0)
+        ranks = new_ranks
+        iterations += 1
+    return ranks.T, iterations, residuals
+
+
+# Solvers that can be chosen by name in `matrix_pagerank`
+METHODS = {
+    "power": power_iteration,
+    "gauss-seidel": gauss_seidel,
+    "aitken": lambda *args, **kwargs: extrapolated_power_iteration(
+        *args, extrapolation="aitken", **kwargs
+    ),
+    "quadratic": lambda *args, **kwargs: extrapolated_power_iteration(
+        *args, extrapolation="quadratic", **kwargs
+    )
+}
+
+
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE, method="power"):
+    """
+    Return PageRank values for each page by solving for the stationary
+    distribution of the sparse transition matrix of `corpus` with one of
+    the `METHODS`, until the L1 norm of the residual is below `tolerance`.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = LinkGraph(corpus)
+    ranks, iterations, residual = METHODS[method](graph, damping_factor, tolerance)
+    return graph.ranks(ranks)
+
+
+def warm_start_pagerank(corpus, damping_factor, path, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page of `corpus`, starting from the
+    ranks saved at `path` by a previous run (if any) and updating them
+    by power iteration down to `tolerance`. Save the new ranks to `path`
+    for next time.
+
+    After a small change to the links, the saved ranks are already close,
+    so far fewer sweeps are needed than from the uniform distribution.
+    Every sweep still covers the whole graph: this is not an update local
+    to the changed links. Pushing residuals from the pages around them
+    first (Gauss-Southwell) does not pay for itself on small-world link
+    graphs, where a change reaches most pages within a few links; on
+    100,000 pages it saved a few sweeps but cost as much as it saved.
+
+    Pages that are new since the previous run start with the average rank.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = LinkGraph(corpus)
+    ranks = load_ranks(path, graph.pages)
+    ranks, iterations, residual = power_iteration(
+        graph, damping_factor, tolerance, ranks=ranks
+    )
+    save_ranks(path, graph.pages, ranks)
+    return graph.ranks(ranks)
+
+
+def save_ranks(path, pages, ranks):
+    """
+    Save a rank vector and the names of its pages to the file at `path`.
+    """
+    with open(path, "wb") as f:
+        np.savez(f, pages=np.array(pages, dtype=str), ranks=ranks)
+
+
+def load_ranks(path, pages):
+    """
+    Return the ranks saved at `path` by `save_ranks` as a vector over
+    `pages`, with the average rank for pages that were not saved, or None
+    if there is no such file.
+    """
+    try:
+        with np.load(path) as data:
+            saved_pages = data["pages"]
+            saved_ranks = data["ranks"]
+    except OSError:
+        return None
+
+    if len(saved_pages) == 0:
+        return None
+
+    pages = np.array(pages, dtype=str)
+    if np.array_equal(saved_pages, pages):
+        return saved_ranks / saved_ranks.sum()
+
+    # Look every page up among the saved ones at once
+    order = np.argsort(saved_pages)
+    saved_pages = saved_pages[order]
+    saved_ranks = saved_ranks[order]
+    positions = np.searchsorted(saved_pages, pages).clip(max=len(saved_pages) - 1)
+    found = saved_pages[positions] == pages
+    ranks = np.where(found, saved_ranks[positions], 1 / len(pages))
+    return ranks / ranks.sum()
+
+
+if __name__ == "__main__":
+    main()
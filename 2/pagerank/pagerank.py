@@ -84,23 +84,48 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    page = random.choice(list(corpus.copy().keys()))
-    probablity_distribution = transition_model(corpus, page, damping_factor)
-
-    samples = list()
-
-    for i in range(n):
-        samples.append(page)
-        weights = list()
-        pages = list(probablity_distribution.keys())
-        for page in pages:
-            weights.append(probablity_distribution[page])
-        page = random.choices(list(probablity_distribution.keys()), weights=weights)[0]
-        probablity_distribution = transition_model(corpus, page, damping_factor)
-
-    for page in probablity_distribution:
-        probablity_distribution[page] = samples.count(page) / len(samples)
-    return probablity_distribution
+    pages, links = link_lists(corpus)
+    start = random.randrange(len(pages))
+    counts, _ = surf(links, damping_factor, n, start)
+    return {page: counts[i] / n for i, page in enumerate(pages)}
+
+
+def link_lists(corpus):
+    """
+    Return a list of the pages in `corpus` and, for each of them, a list
+    of the indices of the pages it links to.
+    """
+    pages = list(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    links = [[index[link] for link in corpus[page]] for page in pages]
+    return pages, links
+
+
+def surf(links, damping_factor, n, page, rng=random):
+    """
+    Take `n` steps of the random surfer from page index `page`, where
+    `links[i]` lists the indices of the pages linked to by page i.
+
+    Instead of building the full transition model at every step, each step
+    flips the damping coin: with probability `damping_factor` it follows a
+    link chosen uniformly from the current page, and otherwise (or if the
+    page has no links) it jumps to a page chosen uniformly from the corpus.
+    This samples the same distribution as `transition_model` in O(1).
+
+    Return a list counting the visits to each page, and the page the
+    surfer ends on.
+    """
+    total = len(links)
+    counts = [0] * total
+    random_number = rng.random
+    for _ in range(n):
+        counts[page] += 1
+        outlinks = links[page]
+        if outlinks and random_number() < damping_factor:
+            page = outlinks[int(random_number() * len(outlinks))]
+        else:
+            page = int(random_number() * total)
+    return counts, page
 
 
 def divergence(previous_probablity_distribution, probablity_distribution):
@@ -0,0 +1,142 @@
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+# Average number of links per page
+LINKS = 8
+
+# Probabilities of the four quadrants an R-MAT link falls in at each level
+RMAT_PROBABILITIES = (0.57, 0.19, 0.19, 0.05)
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{title}</title>
+    </head>
+    <body>
+        <h1>{title}</h1>
+
+        <div>Links:</div>
+        <ul>
+{links}
+        </ul>
+    </body>
+</html>
+"""
+
+LINK = """            <li><a href="{page}">{title}</a></li>"""
+
+
+def main():
+    if len(sys.argv) not in [4, 5]:
+        sys.exit("Usage: python synthetic.py (pa | rmat) pages directory [seed]")
+    model, pages, directory = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+    seed = int(sys.argv[4]) if len(sys.argv) == 5 else None
+    corpus = generate(model, pages, seed=seed)
+    write_corpus(corpus, directory)
+    links = sum(len(corpus[page]) for page in corpus)
+    print(f"Wrote {len(corpus)} pages with {links} links to {directory}")
+
+
+def generate(model, n, links=LINKS, seed=None):
+    """
+    Return a corpus of `n` pages with about `links` links per page, from
+    the model named "pa" (`preferential_attachment`) or "rmat" (`rmat`).
+    """
+    if model == "pa":
+        return preferential_attachment(n, links, seed)
+    elif model == "rmat":
+        return rmat(n, links, seed=seed)
+    raise ValueError(f"Unknown model {model!r}")
+
+
+def preferential_attachment(n, links=LINKS, seed=None):
+    """
+    Return a corpus of `n` pages grown one page at a time, where each new
+    page links to `links` earlier pages, each chosen with probability
+    proportional to one plus the number of links it already receives.
+
+    The corpus is a dictionary where each key is a page, and values are
+    a set of all other pages in the corpus that are linked to by the page,
+    in the format returned by `pagerank.crawl`.
+    """
+    rng = random.Random(seed)
+    names = [page_name(i) for i in range(n)]
+
+    # Each page appears once, plus once per link it receives, so that a
+    # uniform choice from `targets` is a preferential choice of page
+    targets = []
+    corpus = dict()
+    for i in range(n):
+        chosen = set()
+        for _ in range(min(links, i)):
+            chosen.add(targets[rng.randrange(len(targets))])
+        corpus[names[i]] = {names[j] for j in chosen}
+        targets.extend(chosen)
+        targets.append(i)
+    return corpus
+
+
+def rmat(n, links=LINKS, probabilities=RMAT_PROBABILITIES, seed=None):
+    """
+    Return a corpus of `n` pages with about `n * links` links drawn from
+    the recursive matrix (R-MAT) model: each link picks one quadrant of the
+    adjacency matrix according to `probabilities`, then a quadrant of that
+    quadrant, and so on down to a single (source, target) pair.
+
+    Links from a page to itself, or to pages beyond the `n`th when `n` is not
+    a power of two, are dropped. The corpus is in the format returned by
+    `pagerank.crawl`.
+    """
+    rng = np.random.default_rng(seed)
+    levels = max(1, math.ceil(math.log2(n)))
+    edges = n * links
+    cumulative = np.cumsum(probabilities)
+    cumulative /= cumulative[-1]
+    sources = np.zeros(edges, dtype=np.int64)
+    targets = np.zeros(edges, dtype=np.int64)
+    for _ in range(levels):
+        quadrant = np.searchsorted(cumulative, rng.random(edges), side="right")
+        sources = 2 * sources + quadrant // 2
+        targets = 2 * targets + quadrant % 2
+
+    keep = (sources < n) & (targets < n) & (sources != targets)
+    names = [page_name(i) for i in range(n)]
+    corpus = {name: set() for name in names}
+    for source, target in zip(sources[keep].tolist(), targets[keep].tolist()):
+        corpus[names[source]].add(names[target])
+    return corpus
+
+
+def page_name(i):
+    """
+    Return the file name of the `i`th generated page.
+    """
+    return f"{i}.html"
+
+
+def write_corpus(corpus, directory):
+    """
+    Write each page of `corpus` to `directory` as an HTML file that links
+    to its pages the way the sample corpora do, so that `pagerank.crawl`
+    reads back the same corpus.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for page, links in corpus.items():
+        title = page[:-len(".html")]
+        contents = PAGE.format(
+            title=title,
+            links="\n".join(
+                LINK.format(page=link, title=link[:-len(".html")])
+                for link in sorted(links)
+            )
+        )
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(contents)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import math
+import random
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+from pagerank import DAMPING, SAMPLES, crawl, link_lists, surf
+
+# Number of independent random surfers
+WALKERS = 8
+
+# Number of rounds the sample budget is split into; estimates are checked
+# against the tolerance after each round
+ROUNDS = 10
+
+# Normal quantile for a 95% confidence interval
+Z = 1.96
+
+# Link lists and damping factor shared by the walkers of a worker process
+shared = dict()
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python walkers.py corpus [samples] [tolerance]")
+    corpus = crawl(sys.argv[1])
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else SAMPLES
+    tolerance = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    try:
+        ranks, intervals, samples = parallel_sample_pagerank(
+            corpus, DAMPING, n, tolerance=tolerance
+        )
+    except ValueError as error:
+        sys.exit(str(error))
+    print(f"PageRank Results from {WALKERS} Walkers (n = {samples})")
+    for page in sorted(ranks):
+        low, high = intervals[page]
+        print(f"  {page}: {ranks[page]:.4f}  [{low:.4f}, {high:.4f}]")
+
+
+def parallel_sample_pagerank(corpus, damping_factor, n, walkers=WALKERS,
+                             processes=None, seed=None, tolerance=None,
+                             rounds=ROUNDS):
+    """
+    Return PageRank values for each page estimated by `walkers` independent
+    random surfers taking `n` samples in total between them, run across
+    a pool of `processes` worker processes.
+
+    Each walker has its own random number generator, derived from `seed`,
+    so results are reproducible for a given seed. The budget is spent in
+    `rounds` rounds (fewer if that would leave a walker a round with no
+    samples); if `tolerance` is given, sampling stops early once the
+    confidence interval of every page is narrower than `tolerance` on
+    either side of its estimate.
+
+    Return a tuple (ranks, intervals, samples): a dictionary of estimated
+    PageRank values, a dictionary mapping each page to the (low, high) bounds
+    of its 95% confidence interval, and the number of samples taken.
+    """
+    if walkers < 2:
+        raise ValueError("At least two walkers are needed for an interval")
+    if n < walkers:
+        raise ValueError("At least one sample is needed for each walker")
+    rounds = max(1, min(rounds, n // walkers))
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    pages, links = link_lists(corpus)
+
+    # Every walker starts from its own generator and a random page
+    states = []
+    positions = []
+    for walker in range(walkers):
+        rng = random.Random(f"{seed}:{walker}")
+        positions.append(rng.randrange(len(pages)))
+        states.append(rng.getstate())
+
+    counts = [[0] * len(pages) for _ in range(walkers)]
+    steps = [0] * walkers
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=share, initargs=(links, damping_factor)
+    ) as executor:
+        for completed in range(rounds):
+
+            # Split what is left of the budget evenly over the walkers
+            budget = (n - sum(steps)) // (rounds - completed)
+            batch = [budget // walkers] * walkers
+            for walker in range(budget % walkers):
+                batch[walker] += 1
+
+            results = executor.map(walk, states, positions, batch)
+            for walker, (walker_counts, position, state) in enumerate(results):
+                for i, count in enumerate(walker_counts):
+                    counts[walker][i] += count
+                positions[walker] = position
+                states[walker] = state
+                steps[walker] += batch[walker]
+
+            ranks, errors = estimate(counts, steps)
+            if tolerance is not None and max(errors) < tolerance:
+                break
+
+    return (
+        {page: ranks[i] for i, page in enumerate(pages)},
+        {
+            page: (max(0, ranks[i] - errors[i]), min(1, ranks[i] + errors[i]))
+            for i, page in enumerate(pages)
+        },
+        sum(steps)
+    )
+
+
+def share(links, damping_factor):
+    """
+    Initialize a worker process with the corpus shared by all walkers.
+    """
+    shared["links"] = links
+    shared["damping_factor"] = damping_factor
+
+
+def walk(state, position, steps):
+    """
+    Continue one walker, whose generator is in `state` and who is on page
+    index `position`, for `steps` steps.
+
+    Return the walker's visit counts, final page and generator state.
+    """
+    rng = random.Random()
+    rng.setstate(state)
+    counts, position = surf(
+        shared["links"], shared["damping_factor"], steps, position, rng
+    )
+    return counts, position, rng.getstate()
+
+
+def estimate(counts, steps):
+    """
+    Return the PageRank estimate of each page pooled over all walkers, and
+    the half-width of its confidence interval, from the spread of the
+    walkers' individual estimates (which are independent of each other,
+    unlike consecutive samples of one walker).
+    """
+    walkers = len(counts)
+    total = sum(steps)
+    ranks = []
+    errors = []
+    for i in range(len(counts[0])):
+        estimates = [
+            counts[walker][i] / steps[walker] if steps[walker] else 0
+            for walker in range(walkers)
+        ]
+        mean = sum(estimates) / walkers
+        variance = sum((x - mean) ** 2 for x in estimates) / (walkers - 1)
+        ranks.append(sum(counts[walker][i] for walker in range(walkers)) / total)
+        errors.append(Z * math.sqrt(variance / walkers))
+    return ranks, errors
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,11 @@
+import os
+import pickle
+
+# Version of the vocabulary cache format, to be increased whenever the
+# attributes of `Vocabulary` change so that older caches are rebuilt
+VOCABULARY_VERSION = 1
+
+
 class Variable():
 
     ACROSS = "across"
@@ -57,9 +65,11 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, indexed for bitmask domains
+        self.vocabulary = Vocabulary.load(words_file)
+        self.words = set(
+            word for words in self.vocabulary.words.values() for word in words
+        )
 
         # Determine variable set
         self.variables = set()
@@ -125,9 +135,118 @@ class Crossword():
                         cells2.index(intersection)
                     )
 
+        # Compute the variables each variable overlaps
+        self.neighbor_sets = {
+            var: set(
+                v for v in self.variables
+                if v != var and self.overlaps[v, var]
+            )
+            for var in self.variables
+        }
+
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
+        return self.neighbor_sets[var]
+
+
+class Vocabulary():
+
+    def __init__(self, words):
+        """
+        Index a collection of words by length, so that a set of words of one
+        length can be stored as a bitmask whose ith bit is set if it contains
+        the ith word of that length.
+        """
+        # Words of each length, and each word's number among them
+        self.words = dict()
+        for word in sorted(set(words)):
+            self.words.setdefault(len(word), []).append(word)
+        self.index = dict()
+        for words in self.words.values():
+            for i, word in enumerate(words):
+                self.index[word] = i
+
+        # For each length and position, the bitmask of the words of that
+        # length with each letter in that position
+        self.masks = dict()
+        for length, words in self.words.items():
+            self.masks[length] = []
+            for position in range(length):
+                numbers = dict()
+                for i, word in enumerate(words):
+                    numbers.setdefault(word[position], []).append(i)
+                self.masks[length].append({
+                    letter: bitmask(numbers[letter], len(words))
+                    for letter in sorted(numbers)
+                })
+
+        # Bitmask of all words of each length
+        self.length_masks = {
+            length: (1 << len(words)) - 1 for length, words in self.words.items()
+        }
+
+    @classmethod
+    def load(cls, words_file, cache=None):
+        """
+        Return the vocabulary of `words_file`, reading it from a cache file
+        (by default next to `words_file`) if neither the file nor
+        `VOCABULARY_VERSION` has changed since the cache was written, and
+        writing the cache otherwise.
+        """
+        if cache is None:
+            directory, name = os.path.split(words_file)
+            cache = os.path.join(directory, f".{name}.vocabulary")
+        stat = os.stat(words_file)
+        key = (
+            VOCABULARY_VERSION, os.path.abspath(words_file),
+            stat.st_mtime_ns, stat.st_size
         )
+
+        try:
+            with open(cache, "rb") as f:
+                cached_key, vocabulary = pickle.load(f)
+            if cached_key == key:
+                return vocabulary
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            pass
+
+        with open(words_file) as f:
+            vocabulary = cls(f.read().upper().splitlines())
+
+        # Replace the cache atomically, and carry on without it if it
+        # cannot be written
+        temporary = cache + ".tmp"
+        try:
+            with open(temporary, "wb") as f:
+                pickle.dump((key, vocabulary), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, cache)
+        except OSError:
+            pass
+        return vocabulary
+
+    def length_mask(self, length):
+        """Return bitmask of all words of `length`."""
+        return self.length_masks.get(length, 0)
+
+    def letter_masks(self, length, position):
+        """Return dict from each letter to bitmask of words with it at `position`."""
+        masks = self.masks.get(length)
+        return masks[position] if masks else dict()
+
+    def letter_mask(self, length, position, letter):
+        """Return bitmask of words of `length` with `letter` at `position`."""
+        return self.letter_masks(length, position).get(letter, 0)
+
+    def words_in(self, length, mask):
+        """Given a bitmask of words of `length`, return list of its words."""
+        words = self.words.get(length, [])
+        bits = bin(mask)[:1:-1]
+        return [words[i] for i, bit in enumerate(bits) if bit == "1"]
+
+
+def bitmask(numbers, size):
+    """Return bitmask of `size` bits with the bits in `numbers` set."""
+    bits = bytearray((size + 7) // 8)
+    for i in numbers:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, "little")
@@ -1,20 +1,87 @@
+import heapq
+import random
 import sys
+import time
+
+from collections import deque
 
 from crossword import *
 
+# Once the heap of variables holds this many entries per variable, most are
+# out of date, so it is rebuilt
+HEAP_LIMIT = 8
+
+# Ways `CrosswordCreator` can choose the next variable and order its values
+VARIABLE_ORDERS = ["mrv", "degree"]
+VALUE_ORDERS = ["lcv", "alphabetical", "random"]
+
+
+class SearchLimitReached(Exception):
+    """Raised when a search has visited as many nodes as it may."""
+
 
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    def __init__(self, crossword, variable_order="mrv", value_order="lcv",
+                 seed=None, node_limit=None):
         """
         Create new CSP crossword generate.
+
+        `variable_order` is "mrv" (fewest remaining values, then highest
+        degree) or "degree" (highest degree, fixed before the search), and
+        `value_order` is "lcv" (least constraining value), "alphabetical" or
+        "random". If `seed` is given, ties are broken at random from it.
+        If `node_limit` is given, `solve` gives up after that many nodes.
         """
+        if variable_order not in VARIABLE_ORDERS:
+            raise ValueError(f"Unknown variable order {variable_order!r}")
+        if value_order not in VALUE_ORDERS:
+            raise ValueError(f"Unknown value order {value_order!r}")
         self.crossword = crossword
+        self.variable_order = variable_order
+        self.value_order = value_order
+        self.rng = random.Random(seed) if seed is not None else None
+        self.node_limit = node_limit
+        self.limit_reached = False
+
+        # Each domain is a bitmask over the words of the variable's length
+        # in `crossword.vocabulary`, starting from the mask they all share
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.crossword.vocabulary.length_mask(var.length)
             for var in self.crossword.variables
         }
 
+        # Words removed from domains during search, as (variable, removed)
+        # pairs, so that backtracking can put them back
+        self.trail = []
+
+        # Unassigned variables, keyed by (domain size, -degree), for
+        # `select_unassigned_variable`. An entry is pushed whenever a domain
+        # changes rather than updated in place, so old entries are skipped
+        self.heap = []
+
+        # Number of each variable, which breaks ties between variables
+        variables = sorted(
+            self.crossword.variables, key=lambda var: (var.i, var.j, var.direction)
+        )
+        if self.rng is not None:
+            self.rng.shuffle(variables)
+        self.numbers = {var: number for number, var in enumerate(variables)}
+        self.static_order = sorted(
+            variables, key=lambda var: -len(self.crossword.neighbors(var))
+        )
+
+        # Letter counts of each domain, with the domain they were counted from
+        self.letter_count_cache = dict()
+
+        # Counters for profiling: arc revisions made by `ac3`, calls to
+        # `backtrack`, and time spent searching and in each heuristic
+        self.revisions = 0
+        self.nodes = 0
+        self.search_time = 0
+        self.select_time = 0
+        self.order_time = 0
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -90,8 +157,19 @@ class CrosswordCreator():
         Enforce node and arc consistency, and then solve the CSP.
         """
         self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        if not self.ac3():
+            return None
+        self.trail.clear()
+        self.heap = []
+        start = time.perf_counter()
+        try:
+            assignment = self.backtrack(dict())
+        except SearchLimitReached:
+            self.undo(0)
+            self.limit_reached = True
+            assignment = None
+        self.search_time += time.perf_counter() - start
+        return assignment
 
     def enforce_node_consistency(self):
         """
@@ -100,9 +178,9 @@ class CrosswordCreator():
          constraints; in this case, the length of the word.)
         """
         for variable in self.crossword.variables:
-            for word in self.domains[variable].copy():
-                if len(word) != variable.length:
-                    self.domains[variable].remove(word)
+            self.domains[variable] &= self.crossword.vocabulary.length_mask(
+                variable.length
+            )
 
     def revise(self, x, y):
         """
@@ -113,20 +191,63 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        changed = False
         location = self.crossword.overlaps[x, y]
-        if location:
-            i = location[0]
-            j = location[1]
-            for x_word in self.domains[x].copy():
-                match = False
-                for y_word in self.domains[y]:
-                    if x_word[i] == y_word[j]:
-                        match = True
-                if match == False:
-                    self.domains[x].remove(x_word)
-                    changed = True
-        return changed
+        if not location:
+            return False
+        i, j = location
+
+        # Keep the words of x with a letter at i that some word of y has at j
+        vocabulary = self.crossword.vocabulary
+        x_masks = vocabulary.letter_masks(x.length, i)
+        supported = 0
+        for letter, mask in vocabulary.letter_masks(y.length, j).items():
+            if letter in x_masks and self.domains[y] & mask:
+                supported |= x_masks[letter]
+        revised = self.domains[x] & supported
+        if revised == self.domains[x]:
+            return False
+        self.reduce(x, revised)
+        return True
+
+    def reduce(self, var, domain):
+        """
+        Replace the domain of `var` with `domain`, a subset of it, recording
+        the words removed on the trail.
+        """
+        self.trail.append((var, self.domains[var] & ~domain))
+        self.domains[var] = domain
+        self.push(var)
+
+    def undo(self, mark):
+        """
+        Put back every word removed from a domain since the trail had
+        `mark` entries.
+        """
+        while len(self.trail) > mark:
+            var, removed = self.trail.pop()
+            self.domains[var] |= removed
+            self.push(var)
+
+    def assign(self, var, value, assignment):
+        """
+        Reduce the domain of `var` to `value`, remove `value` from the
+        domains of the other unassigned variables, since every word must be
+        unique, and make the domains arc consistent again.
+
+        Return False if a domain ends up empty; return True otherwise.
+        """
+        bit = 1 << self.crossword.vocabulary.index[value]
+        self.reduce(var, bit)
+        arcs = [(z, var) for z in self.crossword.neighbors(var)]
+        for other in self.crossword.variables:
+            if (other in assignment or other.length != var.length or
+                    not self.domains[other] & bit):
+                continue
+            self.reduce(other, self.domains[other] & ~bit)
+            if not self.domains[other]:
+                return False
+            arcs.extend((z, other) for z in self.crossword.neighbors(other))
+        return self.ac3(arcs)
 
     def ac3(self, arcs=None):
         """
@@ -137,23 +258,36 @@ class CrosswordCreator():
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        queue = list()
-        if arcs != None:
-            queue = list(arcs)
-        else:
-            for x in self.crossword.variables:
-                for y in self.crossword.variables:
-                    if x != y: queue.append((x, y))
+        if arcs is None:
+            arcs = [
+                (x, y)
+                for x in self.crossword.variables
+                for y in self.crossword.neighbors(x)
+            ]
+
+        # Queue each arc at most once at a time
+        queue = deque()
+        queued = set()
+        for arc in arcs:
+            if arc not in queued:
+                queue.append(arc)
+                queued.add(arc)
+
         while queue:
-            x, y = queue.pop(0)
+            x, y = queue.popleft()
+            queued.remove((x, y))
+            self.revisions += 1
             if self.revise(x, y):
-                if len(self.domains[x]):
+                if not self.domains[x]:
                     return False
-                neighbors = self.crossword.neighbors(x).remove(y)
-                if neighbors: # besides y of course
-                    for z in neighbors:
-                        queue.append(z, x)
 
+                # x lost values, so arcs into x from its other neighbors
+                # need checking again
+                for z in self.crossword.neighbors(x):
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
+        return True
 
     def assignment_complete(self, assignment):
         """
@@ -198,28 +332,58 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        ordered_domain_values_with_numbers = {value: 0 for value in self.domains[var]}
-        unassigned_variables = set()
-        for other_var in self.crossword.variables:
-            if other_var not in assignment and other_var != var:
-                unassigned_variables.add(other_var)
-        for word in self.domains[var]:
-            for other_var in unassigned_variables:
-                location = self.crossword.overlaps[var, other_var]
-                i = None
-                j = None
-                if location:
-                    i = location[0]
-                    j = location[1]
-                    for other_word in self.domains[other_var]:
-                        if word[i] != other_word[j]:
-                            ordered_domain_values_with_numbers[word] += 1
-        ordered_domain_values_with_numbers = sorted(ordered_domain_values_with_numbers.items(), key=lambda x: x[1])
-        ordered_domain_values = list()
-        for value in ordered_domain_values_with_numbers:
-            ordered_domain_values.append(value[0])
-        return ordered_domain_values
+        start = time.perf_counter()
+        words = self.crossword.vocabulary.words_in(var.length, self.domains[var])
+        if self.value_order == "random" or (
+                self.value_order == "lcv" and self.rng is not None):
+            (self.rng or random).shuffle(words)
+        if self.value_order != "lcv":
+            self.order_time += time.perf_counter() - start
+            return words
+
+        # For each unassigned neighbor, the number of its words with each
+        # letter where it crosses `var`, and its domain size
+        crossings = []
+        for other_var in self.crossword.neighbors(var):
+            if other_var not in assignment:
+                i, j = self.crossword.overlaps[var, other_var]
+                crossings.append((
+                    i,
+                    self.letter_counts(other_var)[j],
+                    self.domains[other_var].bit_count()
+                ))
+
+        # A word rules out the neighbor's words without its letter there
+        ruled_out = {
+            word: sum(size - counts.get(word[i], 0) for i, counts, size in crossings)
+            for word in words
+        }
+        words.sort(key=ruled_out.__getitem__)
+        self.order_time += time.perf_counter() - start
+        return words
 
+    def letter_counts(self, var):
+        """
+        Return a list with, for each position of `var`, a dictionary from
+        each letter to the number of words in the domain of `var` with that
+        letter at that position.
+
+        Counts are cached with the domain they were counted from, and only
+        counted again once the domain has changed.
+        """
+        domain, counts = self.letter_count_cache.get(var, (None, None))
+        if domain != self.domains[var]:
+            domain = self.domains[var]
+            counts = []
+            for position in range(var.length):
+                counts.append(dict())
+                masks = self.crossword.vocabulary.letter_masks(var.length, position)
+                for letter, mask in masks.items():
+                    count = (domain & mask).bit_count()
+                    if count:
+                        counts[position][letter] = count
+            self.letter_count_cache[var] = (domain, counts)
+        return counts
 
     def select_unassigned_variable(self, assignment):
         """
@@ -228,32 +392,60 @@ class CrosswordCreator():
         in its domain. If there is a tie, choose the variable with the highest
         degree. If there is a tie, any of the tied variables are acceptable
         return values.
-        """
-        unassigned_variables = set()
-        for variable in self.crossword.variables:
-            if variable not in assignment:
-                unassigned_variables.add(variable)
-        min_domain = [None, None]
-        max_domain = [None, None]
-        for variable in unassigned_variables:
-            if min_domain[1] == None or len(self.domains[variable]) < min_domain[1]:
-                min_domain = [variable, len(self.domains[variable])]
-            if max_domain[1] == None or len(self.domains[variable]) > max_domain[1]:
-                max_domain = [variable, len(self.domains[variable])]
-        if min_domain != max_domain:
-            return min_domain[0]
-        min_degree = [None, None]
-        max_degree = [None, None]
-        for variable in unassigned_variables:
-            degree = len(self.crossword.neighbors(variable))
-            if min_degree[1] == None or degree < min_degree[1]:
-                min_degree = [variable, degree]
-            if max_degree[1] == None or degree > max_degree[1]:
-                max_degree = [variable, degree]
-        if min_degree != max_degree:
-            return max_degree[0]
-        return unassigned_variables.pop()
 
+        Variables are taken from `self.heap`, skipping entries that are out
+        of date because the variable was assigned or its domain changed.
+        With variable order "degree", domain sizes are ignored and the first
+        unassigned variable in `self.static_order` is returned instead.
+        """
+        start = time.perf_counter()
+        if self.variable_order == "degree":
+            variable = next(
+                (var for var in self.static_order if var not in assignment), None
+            )
+            self.select_time += time.perf_counter() - start
+            return variable
+
+        if len(self.heap) > HEAP_LIMIT * len(self.crossword.variables):
+            self.heap = []
+        if not self.heap:
+            for variable in self.crossword.variables:
+                if variable not in assignment:
+                    self.push(variable)
+
+        variable = None
+        while self.heap:
+            size, _, _, candidate = heapq.heappop(self.heap)
+            if (candidate not in assignment and
+                    size == self.domains[candidate].bit_count()):
+                variable = candidate
+                break
+        self.select_time += time.perf_counter() - start
+        return variable
+
+    def push(self, var):
+        """
+        Add `var` to `self.heap` under its current domain size and degree.
+        """
+        heapq.heappush(self.heap, (
+            self.domains[var].bit_count(),
+            -len(self.crossword.neighbors(var)),
+            self.numbers[var],
+            var
+        ))
+
+    def statistics(self):
+        """
+        Return a dictionary of counters describing the last search.
+        """
+        return {
+            "nodes": self.nodes,
+            "revisions": self.revisions,
+            "seconds": self.search_time,
+            "nodes_per_second": self.nodes / self.search_time if self.search_time else 0,
+            "select_seconds": self.select_time,
+            "order_seconds": self.order_time
+        }
 
     def backtrack(self, assignment):
         """
@@ -261,18 +453,27 @@ class CrosswordCreator():
         crossword and return a complete assignment if possible to do so.
 
         `assignment` is a mapping from variables (keys) to words (values).
+        The domains are kept arc consistent with it after every assignment
+        (maintaining arc consistency), so any value left in a domain is
+        consistent with the assignment, and undone by trail on backtracking.
 
         If no assignment is possible, return None.
         """
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchLimitReached
         if self.assignment_complete(assignment):
             return assignment
         var = self.select_unassigned_variable(assignment)
         for value in self.order_domain_values(var, assignment):
+            mark = len(self.trail)
             assignment[var] = value
-            if self.consistent(assignment):
+            if self.assign(var, value, assignment):
                 result = self.backtrack(assignment)
                 if result: return result
+            self.undo(mark)
             assignment.pop(var)
+        self.push(var)
         return None
 
 
@@ -0,0 +1,227 @@
+import argparse
+import multiprocessing
+import queue
+import random
+import signal
+import time
+
+from crossword import Crossword
+from generate import VALUE_ORDERS, VARIABLE_ORDERS, CrosswordCreator
+
+# Strategies run by default, as "variables-values" or
+# "variables-values-restarts" (see `parse_strategy`)
+STRATEGIES = [
+    "mrv-lcv",
+    "mrv-lcv-restarts",
+    "mrv-random-restarts",
+    "degree-lcv-restarts"
+]
+
+# Seconds to wait for a solution before giving up on every strategy
+TIMEOUT = 60
+
+# Nodes a restarting strategy searches on its first attempt, and the
+# factor the limit grows by on each later attempt
+RESTART_NODES = 100
+RESTART_GROWTH = 1.5
+
+# Seconds to wait for cancelled strategies to report their statistics
+REPORT_TIMEOUT = 1
+
+
+class Cancelled(Exception):
+    """Raised in a strategy's process when it is terminated."""
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve a crossword with several strategies at once."
+    )
+    parser.add_argument("structure", help="crossword structure file")
+    parser.add_argument("words", help="vocabulary file")
+    parser.add_argument("output", nargs="?", help="image file to save")
+    parser.add_argument("-S", "--strategy", action="append",
+                        help="strategy to run, e.g. mrv-lcv-restarts "
+                             "(may be repeated)")
+    parser.add_argument("-t", "--timeout", type=float, default=TIMEOUT,
+                        help="seconds before giving up")
+    parser.add_argument("-s", "--seed", type=int, default=None,
+                        help="seed for the randomized strategies")
+    args = parser.parse_args()
+
+    crossword = Crossword(args.structure, args.words)
+    strategies = [parse_strategy(s) for s in args.strategy or STRATEGIES]
+    assignment, winner, statistics = portfolio(
+        crossword, strategies, args.timeout, args.seed
+    )
+
+    # Print result
+    creator = CrosswordCreator(crossword)
+    if assignment is None:
+        print("No solution." if winner else "Timed out.")
+    else:
+        creator.print(assignment)
+        if args.output:
+            creator.save(assignment, args.output)
+
+    print(f"{'strategy':>24} {'outcome':>14} {'attempts':>8} {'nodes':>9} "
+          f"{'revisions':>10} {'time (s)':>9} {'nodes/s':>9}")
+    for strategy in strategies:
+        stats = statistics[strategy["name"]]
+        print(f"{strategy['name']:>24} {stats['outcome']:>14} "
+              f"{stats.get('attempts', ''):>8} {stats.get('nodes', ''):>9} "
+              f"{stats.get('revisions', ''):>10} "
+              f"{stats.get('seconds', 0):>9.3f} "
+              f"{stats.get('nodes_per_second', 0):>9.0f}")
+
+
+def parse_strategy(text):
+    """
+    Return the strategy described by `text`: a variable order and a value
+    order accepted by `CrosswordCreator`, joined by "-", optionally followed
+    by "-restarts".
+    """
+    parts = text.split("-")
+    restarts = parts[-1] == "restarts"
+    if restarts:
+        parts = parts[:-1]
+    if (len(parts) != 2 or parts[0] not in VARIABLE_ORDERS or
+            parts[1] not in VALUE_ORDERS):
+        raise ValueError(f"Unknown strategy {text!r}")
+    return {
+        "name": text,
+        "variable_order": parts[0],
+        "value_order": parts[1],
+        "restarts": restarts
+    }
+
+
+def portfolio(crossword, strategies, timeout=TIMEOUT, seed=None):
+    """
+    Run every strategy in `strategies` (as returned by `parse_strategy`)
+    on `crossword` in its own process, until one of them solves it or
+    proves it has no solution, or until `timeout` seconds have passed.
+    The other processes are then terminated.
+
+    Return a tuple (assignment, winner, statistics): the solution, or None;
+    the name of the strategy that finished first, or None on a timeout; and
+    a dictionary mapping each strategy's name to a dictionary of its
+    statistics, whose "outcome" is "solved", "unsatisfiable", "cancelled"
+    or "unknown" (if it did not report back in time).
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=run_strategy,
+            args=(crossword, strategy, f"{seed}:{i}", results),
+            daemon=True
+        )
+        for i, strategy in enumerate(strategies)
+    ]
+    for process in processes:
+        process.start()
+
+    # Wait for the first strategy to finish
+    assignment = None
+    winner = None
+    statistics = dict()
+    deadline = time.monotonic() + timeout
+    while winner is None and len(statistics) < len(strategies):
+        try:
+            name, result, stats = results.get(
+                timeout=max(0, deadline - time.monotonic())
+            )
+        except queue.Empty:
+            break
+        statistics[name] = stats
+        if stats["outcome"] in ["solved", "unsatisfiable"]:
+            assignment, winner = result, name
+
+    # Stop the rest, and collect what they report as they stop
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + REPORT_TIMEOUT
+    while len(statistics) < len(strategies):
+        try:
+            name, _, stats = results.get(
+                timeout=max(0, deadline - time.monotonic())
+            )
+        except queue.Empty:
+            break
+        statistics[name] = stats
+    for process in processes:
+        process.join()
+
+    for strategy in strategies:
+        statistics.setdefault(strategy["name"], {"outcome": "unknown"})
+    return assignment, winner, statistics
+
+
+def run_strategy(crossword, strategy, seed, results):
+    """
+    Solve `crossword` with `strategy`, and put a tuple (name, assignment,
+    statistics) on the queue `results` when it finishes or is terminated.
+
+    A restarting strategy starts over with a new random seed each time it
+    reaches its node limit, which grows by `RESTART_GROWTH` each attempt,
+    so that a search stuck on early bad choices does not stay stuck. Other
+    strategies search once, breaking ties from `seed`, until they finish.
+    """
+    def cancel(signum, frame):
+        raise Cancelled
+    signal.signal(signal.SIGTERM, cancel)
+
+    totals = {"attempts": 0, "nodes": 0, "revisions": 0, "seconds": 0}
+    assignment = None
+    outcome = "cancelled"
+    limit = RESTART_NODES
+    creator = None
+    start = time.perf_counter()
+    try:
+        while True:
+            totals["attempts"] += 1
+            creator = CrosswordCreator(
+                crossword,
+                variable_order=strategy["variable_order"],
+                value_order=strategy["value_order"],
+                seed=f"{seed}:{totals['attempts']}",
+                node_limit=int(limit) if strategy["restarts"] else None
+            )
+            start = time.perf_counter()
+            assignment = creator.solve()
+            add_statistics(totals, creator, time.perf_counter() - start)
+            limit_reached, creator = creator.limit_reached, None
+            if assignment is not None:
+                outcome = "solved"
+                break
+            if not limit_reached:
+                outcome = "unsatisfiable"
+                break
+            limit *= RESTART_GROWTH
+    except Cancelled:
+        if creator is not None:
+            add_statistics(totals, creator, time.perf_counter() - start)
+
+    # Report back without being interrupted
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    totals["outcome"] = outcome
+    totals["nodes_per_second"] = (
+        totals["nodes"] / totals["seconds"] if totals["seconds"] else 0
+    )
+    results.put((strategy["name"], assignment, totals))
+
+
+def add_statistics(totals, creator, seconds):
+    """
+    Add the counters of `creator`, which ran for `seconds`, to `totals`.
+    """
+    totals["nodes"] += creator.nodes
+    totals["revisions"] += creator.revisions
+    totals["seconds"] += seconds
+
+
+if __name__ == "__main__":
+    main()